@@ -1,41 +1,147 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import importlib
+import json
+import time
 import uuid
 import os
-import importlib.util
+import socket
+from bot_sandbox import BotError, BotSandbox, BotTimeout, store_upload
 from ultimate_ttt_engine import UltimateTTT  # your game logic
+from match_jobs import JobCancelled, MatchJobs
+import metrics
+from ponder import Ponderer
+from sessions import make_session_store
+import levels
+import telemetry
 
 app = Flask(__name__)
 CORS(app)
 
-# Store games per game_id
-games = {}
+# Bot vs Bot matches run here, a bounded number at a time
+match_jobs = MatchJobs()
 
-BOT_MODULES = {
-    "Very Easy": "very_easy",
-    "Easy": "easy",
-    "Medium": "medium",
-    "Hard": "hard",
-    "Ultimate": "ultimate",
-}
+# Difficulty -> levels.BotLevel: a bot module at a fixed node/playout budget,
+# seeded only when LEVEL_SEED is set, see levels.py
+BOT_MODULES = levels.BOT_MODULES
 
 UPLOAD_FOLDER = "uploaded_bots"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+# Uploaded bots larger than this are refused before anything reads them;
+# whole requests get a little room on top for the other form fields
+MAX_UPLOAD_BYTES = int(os.environ.get("BOT_MAX_UPLOAD_BYTES", 256 * 1024))
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 64 * 1024
 
 
-def load_bot_from_file(filepath):
-    """Dynamically load a bot from a Python file."""
-    spec = importlib.util.spec_from_file_location("custom_bot", filepath)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+# Uploaded bots never run in the web process: their moves are played by a
+# pool of rlimited worker processes with a per-move deadline
+bot_sandbox = BotSandbox()
+# Not in the copies of this module that ultimate's spawned search processes
+# import (as __mp_main__) when the app runs as `python app.py`
+if __name__ != "__mp_main__":
+    bot_sandbox.start()
+
+
+def resolve_bots(session):
+    """Re-attach the bot modules of a session loaded from a shared store."""
+    mode = session.get("mode")
+    if mode == "Player vs Bot":
+        session["bot_module"] = load_bot(session.get("difficulty"))
+    elif mode == "Bot vs Bot":
+        path = session.get("bot1_file")
+        if path and os.path.exists(path):
+            session["bot1"] = bot_sandbox.bot(path)
+        session["bot2"] = load_bot(session.get("difficulty"))
+
+
+# Store games per game_id; idle sessions expire and the oldest are evicted.
+# With SESSION_BACKEND=sqlite they are shared by every worker process.
+games = make_session_store(resolve_bots)
+if __name__ != "__mp_main__":
+    games.start_sweeper()
+
+# Opt-in background search on the human's time in Player vs Bot games
+ponderer = Ponderer()
+games.on_evict = lambda game_id: ponderer.stop(game_id, wait=False)
+
+
+# Prometheus-style metrics, scraped from GET /metrics
+REQUESTS = metrics.REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status", ("route", "status"))
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to build the response, by route", ("route",))
+BOT_THINK_SECONDS = metrics.REGISTRY.histogram(
+    "bot_think_seconds", "Time per bot move, by difficulty (uploaded bots: Uploaded)",
+    ("difficulty",))
+BOT_ERRORS = metrics.REGISTRY.counter(
+    "bot_errors_total", "Bot crashes, move timeouts and failed uploads", ("difficulty", "reason"))
+UPLOAD_LOAD_SECONDS = metrics.REGISTRY.histogram(
+    "bot_upload_load_seconds", "Time to store and load an uploaded bot in the sandbox")
+metrics.REGISTRY.gauge("live_sessions", "Game sessions in the session store",
+                       callback=lambda: len(games))
+metrics.REGISTRY.counter("bot_sandbox_workers_recycled_total", "Sandbox workers replaced",
+                         callback=lambda: bot_sandbox.recycled)
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route)
+        REQUESTS.inc(route, str(response.status_code))
+    return response
+
+
+def missing_game(game_id, error):
+    """Error response for a game_id with no live session."""
+    if games.is_expired(game_id):
+        return jsonify({"success": False, "error": "Game session expired"}), 410
+    return jsonify({"success": False, "error": error}), 400
 
 
 def load_bot(difficulty):
-    module_name = BOT_MODULES.get(difficulty, "medium")
-    return importlib.import_module(module_name)
+    return BOT_MODULES.get(difficulty, BOT_MODULES["Medium"])
+
+
+def difficulty_label(difficulty):
+    """The difficulty load_bot() actually plays, so clients cannot mint labels."""
+    return difficulty if difficulty in BOT_MODULES else "Medium"
+
+
+# Per-difficulty search telemetry of debug requests (of every bot move with
+# SEARCH_TELEMETRY=1), served by /telemetry for tuning
+search_stats = telemetry.Aggregator()
+
+
+def play_bot(bot_module, difficulty, board, prev_move, player, debug=False):
+    """bot_module.play(), collecting search telemetry when debug or
+    SEARCH_TELEMETRY is on; returns (move, SearchTelemetry or None)."""
+    difficulty = difficulty_label(difficulty)
+    started = time.perf_counter()
+    if not (debug or telemetry.ENABLED):
+        bot_move = bot_module.play(board, prev_move, player)
+        BOT_THINK_SECONDS.observe(time.perf_counter() - started, difficulty)
+        return bot_move, None
+    telemetry.start()
+    try:
+        bot_move = bot_module.play(board, prev_move, player)
+    finally:
+        search = telemetry.stop()
+    BOT_THINK_SECONDS.observe(time.perf_counter() - started, difficulty)
+    search_stats.record(difficulty, search)
+    return bot_move, search
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"success": False,
+                    "error": f"Request too large (bot files up to {MAX_UPLOAD_BYTES} bytes)"}), 413
 
 
 @app.route("/")
@@ -43,8 +149,6 @@ def home():
     return jsonify({"message": "Backend is running!"})
 
 
-from werkzeug.utils import secure_filename
-
 @app.route("/start", methods=["POST"])
 def start_game():
     """Start a new game session."""
@@ -77,12 +181,16 @@ def start_game():
         human_player = 1 if player_role == "Player 1" else 2
         session_data["bot_module"] = bot_module
         session_data["human_player"] = human_player
+        session_data["ponder"] = bool(data.get("ponder", False))
 
         # 🔥 Let bot make the first move if human is Player 2
         if human_player == 2:
-            bot_move = bot_module.play(game.board, game.last, 1)
+            bot_move, _ = play_bot(bot_module, difficulty, game.board, game.last, 1,
+                                   bool(data.get("debug")))
             if bot_move:
                 game.move(*bot_move)
+            if session_data["ponder"]:
+                ponderer.start(game_id, bot_module, game.board, game.last, human_player)
 
     # Bot vs Bot Mode
     elif mode == "Bot vs Bot":
@@ -90,18 +198,28 @@ def start_game():
         if not uploaded_file:
             return jsonify({"success": False, "error": "No bot uploaded"}), 400
 
-        filename = secure_filename(uploaded_file.filename)
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        uploaded_file.save(filepath)
+        source = uploaded_file.read(MAX_UPLOAD_BYTES + 1)
+        if len(source) > MAX_UPLOAD_BYTES:
+            BOT_ERRORS.inc("Uploaded", "load")
+            return jsonify({"success": False,
+                            "error": f"Bot file too large (max {MAX_UPLOAD_BYTES} bytes)"}), 400
 
-        bot1 = load_bot_from_file(filepath)
-        bot2_module = BOT_MODULES.get(difficulty, "medium")
-        bot2 = importlib.import_module(bot2_module)
+        started = time.perf_counter()
+        try:
+            filepath = store_upload(source, app.config["UPLOAD_FOLDER"])
+            bot_sandbox.load(filepath)
+        except BotError as e:
+            BOT_ERRORS.inc("Uploaded", "load")
+            return jsonify({"success": False, "error": f"Bot failed to load: {e}"}), 400
+        UPLOAD_LOAD_SECONDS.observe(time.perf_counter() - started)
+        bot1 = bot_sandbox.bot(filepath)
+        bot2 = load_bot(difficulty)
 
         session_data["bot1"] = bot1
+        session_data["bot1_file"] = filepath
         session_data["bot2"] = bot2
 
-    games[game_id] = session_data
+    games.put(game_id, session_data)
 
     return jsonify({
         "success": True,
@@ -116,104 +234,303 @@ def start_game():
 
 import random
 
-@app.route("/bot-vs-bot-run", methods=["POST"])
-def bot_vs_bot_run():
-    """Run a Bot vs Bot game using uploaded bot + difficulty bot."""
-    data = request.get_json()
-    game_id = data.get("game_id")
 
-    session = games.get(game_id)
-    if not session:
-        return jsonify({"success": False, "error": "Game not found"}), 400
+def play_bot_vs_bot(session, on_move=None):
+    """Play the session's Bot vs Bot game to the end and return the result.
 
+    on_move(entry) is called after every move; an invalid or missing bot move
+    is replaced by a random legal one, a bot that misses its move deadline
+    forfeits and a crashing bot raises."""
     game = session["game"]
     bot1 = session.get("bot1")  # Uploaded bot
     bot2 = session.get("bot2")  # Default difficulty bot
-
-    if not bot1 or not bot2:
-        return jsonify({"success": False, "error": "Bots not loaded"}), 400
-
-    board = game.board
-    mainboard = game.mainboard
-    prev_move = game.last
-    winner = game.get_winner()
     move_history = []
+    forfeit = None
+    labels = {1: "Uploaded", 2: difficulty_label(session.get("difficulty"))}
 
-    activeMiniBoard = None
-
-    def get_valid_moves(board, activeMiniBoard):
-        moves = []
-        if activeMiniBoard is not None:
-            miniRow = activeMiniBoard // 3
-            miniCol = activeMiniBoard % 3
-            for i in range(3):
-                for j in range(3):
-                    r, c = miniRow * 3 + i, miniCol * 3 + j
-                    if board[r][c] == 0:
-                        moves.append((r, c))
-        else:
-            for i in range(9):
-                for j in range(9):
-                    if board[i][j] == 0:
-                        moves.append((i, j))
-        return moves
-
-    max_moves = 81  # Full board max
-    while not winner and len(move_history) < max_moves:
+    winner = game.get_winner()
+    while winner is None:
         current_player = game.curr_player
         current_bot = bot1 if current_player == 1 else bot2
-        valid_moves = get_valid_moves(board, activeMiniBoard)
+        valid_moves = game.get_valid_moves()
 
+        started = time.perf_counter()
         try:
-            move = current_bot.play(board, prev_move, current_player)
+            move = current_bot.play(game.board, game.last, current_player)
+        except BotTimeout as e:
+            BOT_ERRORS.inc(labels[current_player], "timeout")
+            forfeit = {"player": current_player, "reason": "timeout", "error": str(e)}
+            winner = 3 - current_player
+            break
         except Exception as e:
-            return jsonify({"success": False, "error": f"Bot crashed: {str(e)}"}), 500
+            BOT_ERRORS.inc(labels[current_player], "crash")
+            raise RuntimeError(f"Bot crashed: {str(e)}") from e
+        think = time.perf_counter() - started
+        BOT_THINK_SECONDS.observe(think, labels[current_player])
+        think_ms = round(think * 1000, 1)
 
-        if not move or move not in valid_moves:
-            import random
+        if not isinstance(move, (tuple, list)) or tuple(move) not in valid_moves:
             move = random.choice(valid_moves)
 
         r, c = move
         game.move(r, c)
-        move_history.append({"player": current_player, "move": [r, c]})
-        prev_move = move
-
-        miniRow = r % 3
-        miniCol = c % 3
-        activeMiniBoard = miniRow * 3 + miniCol if mainboard[miniRow][miniCol] == 0 else None
+        mini = (r // 3) * 3 + c // 3
+        entry = {
+            "ply": len(move_history),
+            "player": current_player,
+            "move": [r, c],
+            "miniboard": {"index": mini, "status": game.status[mini]},
+            "activeMiniBoard": game.target(),
+            "think_ms": think_ms,
+        }
+        move_history.append(entry)
+        if on_move:
+            on_move(entry)
 
         winner = game.get_winner()
 
+    activeMiniBoard = game.target()
+
     # Save session
     session.update({
         "board": game.board,
         "mainboard": game.mainboard,
         "curr_player": game.curr_player,
         "winner": winner,
+        "forfeit": forfeit,
         "activeMiniBoard": activeMiniBoard,
         "move_history": move_history,
         "player1Name": "Uploaded Bot",
         "player2Name": f"{session.get('difficulty', 'Default')} Bot"
     })
+    return match_result(session)
 
+
+def match_result(session):
+    """Result fields of a finished Bot vs Bot session."""
+    game = session["game"]
+    winner = session.get("winner")
     winner_name = None
     if winner == 1:
         winner_name = "Uploaded Bot"
     elif winner == 2:
         winner_name = f"{session.get('difficulty', 'Default')} Bot"
 
-    return jsonify({
-        "success": True,
+    return {
         "board": game.board,
         "mainboard": game.mainboard,
         "currentPlayer": game.curr_player,
         "winner": winner,
         "winner_name": winner_name,
+        "forfeit": session.get("forfeit"),
         "player1": "Uploaded Bot",
         "player2": f"{session.get('difficulty', 'Default')} Bot",
-        "activeMiniBoard": activeMiniBoard,
-        "move_history": move_history
-    })
+        "activeMiniBoard": session.get("activeMiniBoard"),
+        "move_history": session.get("move_history", [])
+    }
+
+
+# One worker process plays a Bot vs Bot match: it claims the session for its
+# job (match_job, match_owner) and saves it after every move with the moves
+# so far and match_status.  Other workers sharing the store (SESSION_BACKEND=
+# sqlite) follow the match through it instead of starting a second one.  A
+# claim with no move for MATCH_STALE seconds (its worker died) is taken over,
+# and so is, right away, a claim of this worker's that it no longer runs.
+MATCH_STALE = 60.0
+MATCH_POLL = 0.25  # seconds between store reads when following another worker's match
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def start_match(game_id, session):
+    """Id of the job playing the session's match: the one it is claimed
+    for, or else a new job on this worker.  None if the game went away."""
+    job_id = session.get("match_job")
+    if job_id is not None:
+        local = match_jobs.snapshot(job_id)
+        status = local["status"] if local else session.get("match_status")
+        if status == "done":
+            return job_id
+        mine = session.get("match_owner") == worker_id()
+        if status in ("queued", "running") and (local or not mine and (
+                time.time() - session.get("match_updated", 0) < MATCH_STALE)):
+            return job_id
+
+    new_id = str(uuid.uuid4())
+    claimed = dict(session, match_job=new_id, match_owner=worker_id(), match_status="queued",
+                   match_error=None, match_updated=time.time(), move_history=[])
+    if not games.put_if(game_id, claimed, "match_job", job_id):
+        # Another request claimed the match first: follow theirs
+        current = games.get(game_id)
+        return current.get("match_job") if current else None
+    match_jobs.submit(game_id, lambda record: run_match(game_id, claimed, new_id, record), new_id)
+    return new_id
+
+
+def run_match(game_id, session, job_id, record):
+    """Match job body: play the game, saving the session after every move.
+    Stops with JobCancelled once the stored session no longer belongs to
+    job_id (the game was restarted, or another worker took the match over)."""
+    history = session["move_history"]
+
+    def save(status, error=None):
+        session.update(match_status=status, match_error=error, match_updated=time.time())
+        if not games.put_if(game_id, session, "match_job", job_id):
+            raise JobCancelled
+
+    def on_move(entry):
+        record(entry)  # raises JobCancelled once the game was restarted here
+        history.append(entry)
+        save("running")
+
+    save("running")
+    try:
+        result = play_bot_vs_bot(session, on_move)
+    except JobCancelled:
+        raise
+    except Exception as e:
+        save("failed", str(e))
+        raise
+    save("done")
+    return result
+
+
+def shared_match(game_id, job_id, since=0):
+    """match_jobs.snapshot() of a match another worker plays, read from the
+    session; None once the session no longer belongs to job_id."""
+    session = games.get(game_id)
+    if not session or session.get("match_job") != job_id:
+        return None
+    moves = session.get("move_history") or []
+    status = session.get("match_status")
+    return {"id": job_id, "game_id": game_id, "status": status,
+            "moves": moves[since:], "moves_played": len(moves),
+            "result": match_result(session) if status == "done" else None,
+            "error": session.get("match_error")}
+
+
+def wait_match(game_id, job_id, since=0, timeout=None):
+    """match_jobs.wait() for a match played by this worker or another one."""
+    if match_jobs.snapshot(job_id) is not None:
+        return match_jobs.wait(job_id, since, timeout)
+    deadline = time.time() + timeout
+    while True:
+        job = shared_match(game_id, job_id, since)
+        if (job is None or job["moves"] or job["status"] in ("done", "failed")
+                or time.time() >= deadline):
+            return job
+        time.sleep(MATCH_POLL)
+
+
+@app.route("/bot-vs-bot-run", methods=["POST"])
+def bot_vs_bot_run():
+    """Queue a Bot vs Bot game (uploaded bot + difficulty bot); returns a job id."""
+    data = request.get_json()
+    game_id = data.get("game_id")
+
+    session = games.get(game_id)
+    if not session:
+        return missing_game(game_id, "Game not found")
+
+    if not session.get("bot1") or not session.get("bot2"):
+        return jsonify({"success": False, "error": "Bots not loaded"}), 400
+
+    job_id = start_match(game_id, session)
+    if job_id is None:
+        return missing_game(game_id, "Game not found")
+
+    return jsonify({"success": True, "job_id": job_id, "status": "queued"}), 202
+
+
+@app.route("/bot-vs-bot-status", methods=["GET"])
+def bot_vs_bot_status():
+    """Progress of a Bot vs Bot job: moves from index `since` on and, once
+    finished, the same result fields /bot-vs-bot-run used to return.  With
+    game_id as well, any worker process can answer."""
+    job_id = request.args.get("job_id")
+    game_id = request.args.get("game_id")
+    since = request.args.get("since", 0, type=int)
+
+    job = match_jobs.snapshot(job_id, since)
+    if not job and game_id:
+        job = shared_match(game_id, job_id, since)
+    if not job:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    session = games.get(job["game_id"])
+    response = {
+        "success": job["status"] != "failed",
+        "job_id": job_id,
+        "status": job["status"],
+        "moves": job["moves"],
+        "moves_played": job["moves_played"],
+    }
+    if session:
+        response["mainboard"] = session["game"].mainboard
+    if job["status"] == "failed":
+        response["error"] = job["error"]
+    elif job["status"] == "cancelled":
+        response["success"] = False
+        response["error"] = "Game was restarted"
+    elif job["status"] == "done":
+        response.update(job["result"])
+    return jsonify(response)
+
+def sse(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/bot-vs-bot-stream", methods=["GET"])
+def bot_vs_bot_stream():
+    """Run (or follow) a Bot vs Bot game and stream it as Server-Sent Events.
+
+    Each move is sent as a `move` event as soon as the bot returns it; the
+    game ends with an `end` event carrying the result (without the history)
+    or an `error` event."""
+    game_id = request.args.get("game_id")
+
+    session = games.get(game_id)
+    if not session:
+        return missing_game(game_id, "Game not found")
+
+    if not session.get("bot1") or not session.get("bot2"):
+        return jsonify({"success": False, "error": "Bots not loaded"}), 400
+
+    job_id = start_match(game_id, session)
+    if job_id is None:
+        return missing_game(game_id, "Game not found")
+    # A reconnecting EventSource resumes after the last move it received
+    since = request.headers.get("Last-Event-ID", -1, type=int) + 1
+
+    def events():
+        nonlocal since
+        while True:
+            job = wait_match(game_id, job_id, since, timeout=15)
+            if job is None:
+                yield sse("error", {"error": "Job not found"})
+                return
+            for entry in job["moves"]:
+                yield sse("move", entry, entry["ply"])
+            since += len(job["moves"])
+            if job["status"] == "done":
+                result = {k: v for k, v in job["result"].items() if k != "move_history"}
+                yield sse("end", result)
+                return
+            if job["status"] == "failed":
+                yield sse("error", {"error": job["error"]})
+                return
+            if job["status"] == "cancelled":
+                yield sse("error", {"error": "Game was restarted"})
+                return
+            if not job["moves"]:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 @app.route("/move", methods=["POST"])
 def move():
@@ -224,7 +541,7 @@ def move():
 
     session = games.get(game_id)
     if not session:
-        return jsonify({"success": False, "error": "Invalid game ID"}), 400
+        return missing_game(game_id, "Invalid game ID")
 
     game = session["game"]
     mode = session["mode"]
@@ -234,6 +551,7 @@ def move():
         return jsonify({"success": False, "error": "Invalid move"}), 400
 
     winner = game.get_winner()
+    search = None
 
     if mode == "Player vs Bot" and winner is None:
         bot_module = session.get("bot_module")
@@ -241,21 +559,31 @@ def move():
         bot_player = 3 - human_player
         prev_move = game.last
 
+        ponderer.stop(game_id)
         try:
-            bot_move = bot_module.play(game.board, prev_move, bot_player)
+            bot_move, search = play_bot(bot_module, session.get("difficulty"), game.board,
+                                        prev_move, bot_player, bool(data.get("debug")))
             if bot_move and game.move(*bot_move):
                 winner = game.get_winner()
         except Exception as e:
+            BOT_ERRORS.inc(difficulty_label(session.get("difficulty")), "crash")
+            games.put(game_id, session)
             return jsonify({"success": False, "error": f"Bot crashed: {str(e)}"}), 500
+        if session.get("ponder") and winner is None:
+            ponderer.start(game_id, bot_module, game.board, game.last, human_player)
 
-    return jsonify({
+    games.put(game_id, session)
+    response = {
         "success": True,
         "board": game.board,
         "mainboard": game.mainboard,
         "currentPlayer": game.curr_player,
         "winner": game.get_winner(),
         "lastMove": game.last,
-    })
+    }
+    if data.get("debug") and search is not None:
+        response["telemetry"] = search.to_dict()
+    return jsonify(response)
 
 
 @app.route("/state", methods=["GET"])
@@ -265,7 +593,7 @@ def get_state():
     session = games.get(game_id)
 
     if not session:
-        return jsonify({"success": False, "error": "Invalid game ID"}), 400
+        return missing_game(game_id, "Invalid game ID")
 
     game = session["game"]
 
@@ -285,10 +613,10 @@ def restart_game():
     data = request.json
     game_id = data.get("game_id")
 
-    if not game_id or game_id not in games:
-        return jsonify({"success": False, "error": "Invalid game ID"}), 400
+    old_session = games.get(game_id)
+    if not old_session:
+        return missing_game(game_id, "Invalid game ID")
 
-    old_session = games[game_id]
     mode = old_session["mode"]
     difficulty = old_session.get("difficulty", "Medium")
     player1_name = old_session["player1Name"]
@@ -309,11 +637,16 @@ def restart_game():
     if mode == "Player vs Bot":
         new_session["bot_module"] = old_session.get("bot_module")
         new_session["human_player"] = old_session.get("human_player")
+        new_session["ponder"] = old_session.get("ponder", False)
+        ponderer.stop(game_id)
     elif mode == "Bot vs Bot":
         new_session["bot1"] = old_session.get("bot1")
+        new_session["bot1_file"] = old_session.get("bot1_file")
         new_session["bot2"] = old_session.get("bot2")
+        # The old game's match must not keep playing (and saving) over this one
+        match_jobs.cancel(game_id)
 
-    games[game_id] = new_session
+    games.put(game_id, new_session)
 
     return jsonify({
         "success": True,
@@ -326,6 +659,34 @@ def restart_game():
     })
 
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Session store counters: live sessions, evictions, approximate memory."""
+    return jsonify(games.stats())
+
+
+@app.route("/telemetry", methods=["GET"])
+def search_telemetry():
+    """Per-difficulty histograms of the bot moves collected so far."""
+    return jsonify({"enabled": telemetry.ENABLED, "difficulties": search_stats.to_dict()})
+
+
+@app.route("/levels", methods=["GET"])
+def difficulty_levels():
+    """Budget and seed of every difficulty, with the p50/p99 think time
+    published by `python benchmark.py levels`."""
+    latency = levels.published_latency()
+    return jsonify({name: {"module": level.module_name, "budget": level.budget,
+                           "seed": level.seed, "latency": latency.get(name)}
+                    for name, level in BOT_MODULES.items()})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Request, bot and session metrics in the Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))  # use Render's PORT if available
     app.run(host="0.0.0.0", port=port, debug=True)
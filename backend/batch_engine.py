@@ -0,0 +1,117 @@
+# Vectorized NumPy engine that plays N games of Ultimate TTT in lockstep.
+#
+# Cells are stored mini-board major like the bitboards in ultimate_ttt_engine:
+# column b * 9 + i is cell i = (r % 3) * 3 + c % 3 of mini-board
+# b = (r // 3) * 3 + c // 3.  Rules match UltimateTTT: a move into a won,
+# drawn or full target board frees the next player to play any empty cell.
+#
+#   result = play_games(100_000, seed=1)
+#   result.winners    (N,) int8: 1 = X, 2 = O, 3 = draw
+#   result.moves      (N, 81) int8: row-major r * 9 + c per ply, -1 after the end
+#   result.lengths    (N,) int16 plies played
+#   result.cells      (N, 81) int8 final boards in the column layout above
+
+from collections import namedtuple
+
+import numpy as np
+
+from mini_tables import POPCOUNT, STATUS, TERNARY, WIN_CELLS
+from ultimate_ttt_engine import DRAW, O, X
+
+BatchResult = namedtuple("BatchResult", "winners moves lengths cells")
+
+TERNARY_NP = np.asarray(TERNARY, dtype=np.int32)
+POPCOUNT_NP = np.frombuffer(POPCOUNT, dtype=np.uint8).astype(np.int32)
+STATUS_NP = np.frombuffer(STATUS, dtype=np.uint8).astype(np.int8)
+WIN_CELLS_NP = [None] + [np.asarray(WIN_CELLS[p], dtype=np.int16) for p in (X, O)]
+
+# NTH[mask, k]: position of the k-th set bit of a 9-bit mask
+NTH = np.zeros((512, 9), dtype=np.int64)
+for _m in range(512):
+    _bits = [i for i in range(9) if _m >> i & 1]
+    NTH[_m, :len(_bits)] = _bits
+
+# Column index (b * 9 + i) -> row-major cell index r * 9 + c
+_b, _i = np.divmod(np.arange(81), 9)
+TO_ROW_MAJOR = ((_b // 3 * 3 + _i // 3) * 9 + _b % 3 * 3 + _i % 3).astype(np.int8)
+del _b, _i, _m, _bits
+
+
+def pick_cells(candidates, rng):
+    """Uniform random set bit across each row of (N, 9) masks -> (boards, cells)."""
+    counts = POPCOUNT_NP[candidates]
+    cum = counts.cumsum(axis=1)
+    k = (rng.random(len(candidates)) * cum[:, -1]).astype(np.int64)
+    boards = (cum > k[:, None]).argmax(axis=1)
+    rows = np.arange(len(candidates))
+    k -= cum[rows, boards] - counts[rows, boards]
+    return boards, NTH[candidates[rows, boards], k]
+
+
+def play_games(n, seed=None, policy="random"):
+    """Play n games to the end; policy is "random" or "greedy" (take a local win)."""
+    rng = np.random.default_rng(seed)
+    greedy = policy == "greedy"
+    # Per-player 9-bit masks per mini-board drive move selection; cells mirrors
+    # them as the (N, 81) int8 board returned to callers.
+    masks = np.zeros((3, n, 9), dtype=np.int16)
+    cells = np.zeros((n, 81), dtype=np.int8)
+    won = np.zeros((3, n), dtype=np.int16)     # macro masks of won mini-boards
+    closed = np.zeros(n, dtype=np.int16)       # won or drawn mini-boards
+    forced = np.full(n, -1, dtype=np.int64)
+    winners = np.zeros(n, dtype=np.int8)
+    moves = np.full((n, 81), -1, dtype=np.int8)
+    lengths = np.zeros(n, dtype=np.int16)
+
+    live = np.arange(n)
+    player = X
+    for ply in range(81):
+        if not len(live):
+            break
+        f = forced[live]
+
+        # Forced games (the common case) only look at one mini-board
+        b = np.maximum(f, 0)
+        xb, ob = masks[X][live, b], masks[O][live, b]
+        m = 0x1FF ^ (xb | ob)
+        if greedy:
+            wins = WIN_CELLS_NP[player][TERNARY_NP[xb] + 2 * TERNARY_NP[ob]] & m
+            m = np.where(wins != 0, wins, m)
+        i = NTH[m, (rng.random(len(live)) * POPCOUNT_NP[m]).astype(np.int64)]
+
+        # Free moves pick among the empty cells of all nine boards
+        free = np.flatnonzero(f < 0)
+        if len(free):
+            fx, fo = masks[X][live[free]], masks[O][live[free]]
+            candidates = 0x1FF ^ (fx | fo)
+            if greedy:
+                wins = WIN_CELLS_NP[player][TERNARY_NP[fx] + 2 * TERNARY_NP[fo]] & candidates
+                candidates = np.where(wins.any(axis=1)[:, None], wins, candidates)
+            b[free], i[free] = pick_cells(candidates, rng)
+
+        masks[player][live, b] |= (1 << i).astype(np.int16)
+        col = b * 9 + i
+        cells[live, col] = player
+        moves[live, ply] = TO_ROW_MAJOR[col]
+        lengths[live] = ply + 1
+
+        # Re-score only the mini-board that was played in
+        st = STATUS_NP[TERNARY_NP[masks[X][live, b]] + 2 * TERNARY_NP[masks[O][live, b]]]
+        bit = (1 << b).astype(np.int16)
+        keep = ~bit
+        won[X][live] = (won[X][live] & keep) | np.where(st == X, bit, 0)
+        won[O][live] = (won[O][live] & keep) | np.where(st == O, bit, 0)
+        closed[live] = (closed[live] & keep) | np.where(st != 0, bit, 0)
+        forced[live] = np.where(closed[live] >> i & 1, -1, i)
+
+        g = STATUS_NP[TERNARY_NP[won[X][live]] + 2 * TERNARY_NP[won[O][live]]]
+        done_winner = np.where(g == DRAW, 0, g)
+        if ply == 80:  # every cell filled
+            done_winner[done_winner == 0] = DRAW
+
+        finished = done_winner != 0
+        winners[live[finished]] = done_winner[finished]
+        live = live[~finished]
+        player = O if player == X else X
+
+    return BatchResult(winners, moves, lengths, cells)
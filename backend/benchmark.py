@@ -0,0 +1,157 @@
+# Micro-benchmarks for the game engine and the bundled bots.
+# Run from backend/:  python benchmark.py engine
+
+import argparse
+import importlib
+import json
+import random
+import time
+
+from ultimate_ttt_engine import UltimateTTT
+
+
+def bench_engine(games=2000, seed=0):
+    """Random playouts through the public engine API; returns moves/second."""
+    rng = random.Random(seed)
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        game = UltimateTTT()
+        while game.get_winner() is None:
+            r, c = rng.choice(game.get_valid_moves())
+            game.move(r, c)
+            moves += 1
+    elapsed = time.perf_counter() - start
+    print(f"engine: {games} games, {moves} moves in {elapsed:.2f}s "
+          f"-> {moves / elapsed:,.0f} moves/s")
+    return moves / elapsed
+
+
+def sample_positions(count=4, plies=(8, 16, 24, 32), seed=1):
+    """Reproducible mid-game positions reached by random play."""
+    rng = random.Random(seed)
+    positions = []
+    for i in range(count):
+        game = UltimateTTT()
+        for _ in range(plies[i % len(plies)]):
+            game.move(*rng.choice(game.get_valid_moves()))
+        positions.append((game.board, game.last, game.curr_player))
+    return positions
+
+
+def bench_search(bots=("medium", "hard", "ultimate")):
+    """Nodes/second of each search bot's play() on the sample positions."""
+    import telemetry
+    results = {}
+    positions = sample_positions()
+    for name in bots:
+        module = importlib.import_module(name)
+        nodes = 0
+        start = time.perf_counter()
+        for board, last, player in positions:
+            telemetry.start()
+            module.play(board, last, player)
+            nodes += telemetry.stop().nodes
+        elapsed = time.perf_counter() - start
+        results[name] = nodes / elapsed
+        print(f"{name}: {nodes} nodes in {elapsed:.2f}s -> {results[name]:,.0f} nodes/s")
+    return results
+
+
+def bench_mcts(seconds=1.0):
+    """Playouts/second of the MCTS bot on the same positions as bench_search."""
+    import mcts
+    mcts.TIME_LIMIT = seconds
+    total = elapsed = 0
+    for board, last, player in sample_positions():
+        mcts._trees.clear()
+        mcts.play(board, last, player)
+        total += mcts.stats["playouts"]
+        elapsed += mcts.stats["seconds"]
+    print(f"mcts: {total} playouts in {elapsed:.2f}s -> {total / elapsed:,.0f} playouts/s")
+    return total / elapsed
+
+
+def bench_batch(games=50000, seed=0):
+    """Games/second of the NumPy batch engine vs looping UltimateTTT.move()."""
+    import batch_engine
+    looped = bench_engine(games=1000, seed=seed) / 65.3  # mean random game length
+    start = time.perf_counter()
+    batch_engine.play_games(games, seed=seed)
+    elapsed = time.perf_counter() - start
+    print(f"batch: {games} games in {elapsed:.2f}s -> {games / elapsed:,.0f} games/s "
+          f"({games / elapsed / looped:.1f}x UltimateTTT.move)")
+    return games / elapsed
+
+
+def bench_parallel(workers=(1, 2, 4, 8)):
+    """Depth the ultimate bot completes within TIME_LIMIT at each worker count."""
+    import ultimate
+    positions = sample_positions()
+    results = {}
+    for n in workers:
+        ultimate.SEARCH_WORKERS = n
+        depths = []
+        for board, last, player in positions:
+            ultimate.transposition_table.clear()
+            ultimate.play(board, last, player)
+            depths.append(ultimate.stats["depth"])
+        results[n] = sum(depths) / len(depths)
+        print(f"ultimate, {n} workers ({ultimate.stats['workers']} used): depths {depths} "
+              f"in {ultimate.TIME_LIMIT}s -> mean {results[n]:.2f}")
+    return results
+
+
+def percentile(values, q):
+    """Nearest-rank q-th percentile of values."""
+    ranked = sorted(values)
+    return ranked[max(0, -(-len(ranked) * q // 100) - 1)]
+
+
+def bench_levels(positions=200, write=True):
+    """p50/p99 think time of every app difficulty level over reproducible
+    positions from across the game; writes levels.LATENCY_PATH.  Needs a
+    few hundred positions for the p99 to be more than the maximum."""
+    import levels
+    plies = tuple(range(0, 60, 4))
+    samples = [p for p in sample_positions(positions * 2, plies, seed=7)
+               if UltimateTTT.from_board(*p).get_winner() is None][:positions]
+    results = {}
+    for name, level in levels.BOT_MODULES.items():
+        times = []
+        for board, last, player in samples:
+            start = time.perf_counter()
+            level.play(board, last, player)
+            times.append(time.perf_counter() - start)
+        results[name] = {"module": level.module_name, "budget": level.budget, "seed": level.seed,
+                         "positions": len(times), "p50": round(percentile(times, 50), 4),
+                         "p99": round(percentile(times, 99), 4),
+                         "max": round(max(times), 4)}
+        print(f"{name:9} {level.module_name:9} budget {str(level.budget):>7}: "
+              f"p50 {results[name]['p50']:.3f}s  p99 {results[name]['p99']:.3f}s")
+    if write:
+        with open(levels.LATENCY_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    return results
+
+
+BENCHMARKS = {
+    "engine": bench_engine,
+    "search": bench_search,
+    "mcts": bench_mcts,
+    "batch": bench_batch,
+    "parallel": bench_parallel,
+    "levels": bench_levels,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ultimate TTT benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    args = parser.parse_args()
+    BENCHMARKS[args.name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# Runs uploaded bots in a pool of pre-started worker processes.
+#
+# Workers are fresh interpreters running this file (not forks of the web
+# process), so bot code sees none of the server's memory.  They start with a
+# minimal environment (no server secrets) in an empty scratch directory.
+# Uploaded code used to be exec'd inside the web process and play() ran in the
+# request thread with no time limit, so one looping bot could stall a worker
+# for good.  Each sandbox worker keeps the bots it has loaded between moves,
+# runs with CPU, memory, file-size and process-count rlimits, and is killed
+# and replaced when a move misses its wall-clock deadline, when it dies, or
+# after MOVES_PER_WORKER moves.
+#
+# This contains crashes, loops and runaway memory, not malicious code: a
+# worker runs as the server's user and can still read, rename or delete any
+# file that user can (the app source, sessions.db).  Set BOT_SANDBOX_USER to
+# an unprivileged account (the server needs the rights to switch to it) to
+# run the workers under it instead.
+#
+# Uploads are stored once per content hash (store_upload), at most
+# MAX_UPLOADS of them, least recently uploaded dropped first.  Untrusted
+# source is never parsed in the web process: the first load compiles it in a
+# worker, which sends the bytecode back to be saved next to the source (the
+# workers cannot write files).  Workers keep loaded bots in an LRU bounded by
+# count and bytecode size, so a rematch with the same file compiles nothing.
+#
+# Requests and replies are short byte strings over a pair of pipes:
+#   L<path>                          load (and keep) the bot at path
+#                                    -> K, or K<bytecode> if it compiled it
+#   P<81 cells><row><col><player><path>  play one move -> M<row><col>
+#   any failure -> E<message>
+
+import hashlib
+import marshal
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import types
+from collections import OrderedDict
+from multiprocessing.connection import Connection
+
+try:
+    import resource
+except ImportError:  # POSIX only; elsewhere workers run without rlimits
+    resource = None
+
+SANDBOX_WORKERS = int(os.environ.get("BOT_SANDBOX_WORKERS", 2))
+MOVE_TIMEOUT = float(os.environ.get("BOT_MOVE_TIMEOUT", 5.0))   # wall-clock seconds per move
+LOAD_TIMEOUT = 10.0
+MEMORY_MB = int(os.environ.get("BOT_MEMORY_MB", 512))
+SANDBOX_USER = os.environ.get("BOT_SANDBOX_USER") or None
+MOVES_PER_WORKER = 2000
+MAX_UPLOADS = int(os.environ.get("BOT_MAX_UPLOADS", 1000))
+BOTS_PER_WORKER = 16                      # loaded bots kept by each worker...
+BOT_CACHE_BYTES = 8 * 1024 * 1024         # ...and their total bytecode size
+
+PLAY = struct.Struct("81sBBB")
+NO_MOVE = 255
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# All a worker gets of the server's environment: enough to import the engine
+WORKER_ENV = {"PYTHONPATH": BACKEND_DIR, "PYTHONDONTWRITEBYTECODE": "1", "LANG": "C.UTF-8"}
+
+
+class BotError(Exception):
+    pass
+
+
+class BotTimeout(BotError):
+    pass
+
+
+def _limit_resources():
+    if resource is None:
+        return
+    memory = MEMORY_MB * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    # No new processes or threads (not enforced for root)
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def _cpu_budget(seconds):
+    """Let the worker use `seconds` more CPU time before SIGXCPU kills it."""
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]  # left alone so it can be raised again
+    resource.setrlimit(resource.RLIMIT_CPU, (used + int(seconds) + 1, hard))
+
+
+def bytecode_path(path):
+    return f"{os.path.splitext(path)[0]}.{sys.implementation.cache_tag}.bin"
+
+
+def _write(target, content):
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, target)  # concurrent writers of one file write the same bytes
+
+
+def store_upload(data, folder):
+    """Save uploaded source as <sha256>.py in folder (once per content) and
+    return its absolute path; it is compiled by the first load().  Drops the
+    least recently uploaded files past MAX_UPLOADS."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.abspath(os.path.join(folder, digest + ".py"))
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        _write(path, data)
+    prune_uploads(folder)
+    return path
+
+
+def prune_uploads(folder, keep=MAX_UPLOADS):
+    """Delete all but the `keep` most recently uploaded bots (and their
+    bytecode) from folder; other files there are left alone."""
+    uploads = []
+    for entry in os.scandir(folder):
+        name, ext = os.path.splitext(entry.name)
+        if ext == ".py" and len(name) == 64 and all(c in "0123456789abcdef" for c in name):
+            try:
+                uploads.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:  # pruned by a concurrent upload
+                pass
+    uploads.sort(reverse=True)
+    for _, path in uploads[keep:]:
+        for target in (path, bytecode_path(path)):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+
+
+def _load(path):
+    """(module, bytecode size, bytecode if it had to be compiled else None)
+    for the bot at path, from its saved bytecode when there is some."""
+    compiled = None
+    try:
+        with open(bytecode_path(path), "rb") as f:
+            data = f.read()
+        code = marshal.loads(data)
+    except (OSError, ValueError, EOFError):
+        with open(path, "rb") as f:
+            code = compile(f.read(), path, "exec")
+        data = compiled = marshal.dumps(code)
+    # Named after the file, i.e. the content hash, so every upload is distinct
+    module = types.ModuleType("uploaded_bot_" + os.path.splitext(os.path.basename(path))[0])
+    module.__file__ = path
+    exec(code, module.__dict__)
+    return module, len(data), compiled
+
+
+def _worker(requests, replies):
+    sys.dont_write_bytecode = True
+    _limit_resources()
+    bots = OrderedDict()  # path -> (module, size), least recently used first
+    cached_bytes = 0
+    while True:
+        try:
+            msg = requests.recv_bytes()
+        except EOFError:
+            return
+        op, body = msg[:1], msg[1:]
+        compiled = None
+        try:
+            if op == b"L":
+                path = body.decode()
+            else:
+                cells, r, c, player = PLAY.unpack_from(body)
+                path = body[PLAY.size:].decode()
+            if path in bots:
+                bots.move_to_end(path)
+            else:
+                _cpu_budget(LOAD_TIMEOUT)
+                module, size, compiled = _load(path)
+                bots[path] = module, size
+                cached_bytes += size
+                while len(bots) > 1 and (len(bots) > BOTS_PER_WORKER
+                                         or cached_bytes > BOT_CACHE_BYTES):
+                    cached_bytes -= bots.popitem(last=False)[1][1]
+            bot = bots[path][0]
+            if op == b"L":
+                replies.send_bytes(b"K" + (compiled or b""))
+                continue
+
+            board = [list(cells[i:i + 9]) for i in range(0, 81, 9)]
+            last = None if r == NO_MOVE else (r, c)
+            _cpu_budget(MOVE_TIMEOUT)
+            move = bot.play(board, last, player)
+            try:
+                r, c = move
+                reply = bytes([r, c])
+            except (TypeError, ValueError):  # None, wrong shape or out of range
+                reply = bytes([NO_MOVE, NO_MOVE])
+            replies.send_bytes(b"M" + reply)
+        except BaseException as e:
+            replies.send_bytes(b"E" + f"{type(e).__name__}: {e}".encode())
+
+
+class _Worker:
+    def __init__(self):
+        child_in, self_out = os.pipe()
+        self_in, child_out = os.pipe()
+        self.scratch = tempfile.mkdtemp(prefix="bot-sandbox-")
+        if SANDBOX_USER is not None:
+            shutil.chown(self.scratch, SANDBOX_USER)
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(child_in), str(child_out)],
+            pass_fds=(child_in, child_out), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            cwd=self.scratch, env=WORKER_ENV, user=SANDBOX_USER)
+        os.close(child_in)
+        os.close(child_out)
+        self.requests = Connection(self_out, readable=False)
+        self.replies = Connection(self_in, writable=False)
+        self.bots = set()
+        self.moves = 0
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+        self.requests.close()
+        self.replies.close()
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+class BotSandbox:
+    def __init__(self, workers=SANDBOX_WORKERS):
+        self._size = workers
+        self._idle = []
+        self._started = False
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self.recycled = 0
+        self.timeouts = 0
+
+    def start(self):
+        """Start the worker processes now rather than on the first move."""
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        if not self._started:
+            self._idle.extend(_Worker() for _ in range(self._size))
+            self._started = True
+
+    def load(self, path):
+        """Load the bot at path in a worker, saving its bytecode if the worker
+        had to compile it; raises BotError if it fails (syntax errors too)."""
+        bytecode = self._call(path, b"L" + path.encode(), LOAD_TIMEOUT)
+        if bytecode:
+            _write(bytecode_path(path), bytecode)
+
+    def play(self, path, board, last, player):
+        """The bot's move as (row, col), or None if it returned no usable move.
+
+        Raises BotTimeout if play() misses the deadline, BotError if it raises
+        or kills its worker."""
+        cells = bytes(v for row in board for v in row)
+        r, c = last if last else (NO_MOVE, NO_MOVE)
+        reply = self._call(path, b"P" + PLAY.pack(cells, r, c, player) + path.encode(),
+                           MOVE_TIMEOUT)
+        return None if reply[0] == NO_MOVE else (reply[0], reply[1])
+
+    def bot(self, path):
+        return SandboxedBot(self, path)
+
+    def _call(self, path, msg, timeout):
+        worker = self._checkout(path)
+        healthy = False
+        try:
+            worker.requests.send_bytes(msg)
+            if not worker.replies.poll(timeout):
+                self.timeouts += 1
+                raise BotTimeout(f"no move within {timeout:g}s")
+            try:
+                reply = worker.replies.recv_bytes()
+            except (EOFError, OSError):
+                raise BotError("bot process died (memory or CPU limit?)") from None
+            healthy = True
+        finally:
+            self._checkin(worker, path, healthy)
+        if reply[:1] == b"E":
+            raise BotError(reply[1:].decode(errors="replace"))
+        return reply[1:]
+
+    def _checkout(self, path):
+        with self._available:
+            self._start()
+            self._available.wait_for(lambda: self._idle)
+            # Prefer a worker that already has this bot loaded
+            for i, worker in enumerate(self._idle):
+                if path in worker.bots:
+                    return self._idle.pop(i)
+            return self._idle.pop()
+
+    def _checkin(self, worker, path, healthy):
+        worker.moves += 1
+        if healthy and worker.moves < MOVES_PER_WORKER:
+            worker.bots.add(path)
+        else:
+            worker.kill()
+            worker = _Worker()
+            self.recycled += 1
+        with self._available:
+            self._idle.append(worker)
+            self._available.notify()
+
+
+class SandboxedBot:
+    """Stands in for a bot module: play() runs in the sandbox."""
+
+    def __init__(self, sandbox, path):
+        self.sandbox = sandbox
+        self.path = path
+        self.__name__ = os.path.splitext(os.path.basename(path))[0]
+
+    def play(self, board, prev_move, player):
+        return self.sandbox.play(self.path, board, prev_move, player)
+
+
+if __name__ == "__main__":
+    _worker(Connection(int(sys.argv[1]), writable=False),
+            Connection(int(sys.argv[2]), readable=False))
@@ -1,17 +1,15 @@
 import random
 
-def get_local_board(board, tr, tc):
-    return [[board[tr*3 + i][tc*3 + j] for j in range(3)] for i in range(3)]
+from mini_tables import COMPLETED, WIN_CELLS, grid_index, mini_index
 
 def check_win(board, player):
-    for i in range(3):
-        if all(board[i][j] == player for j in range(3)) or all(board[j][i] == player for j in range(3)):
-            return True
-    if board[0][0] == board[1][1] == board[2][2] == player:
-        return True
-    if board[0][2] == board[1][1] == board[2][0] == player:
-        return True
-    return False
+    return COMPLETED[player][mini_index(board)] != 0
+
+def wins_local(board, move, player):
+    """True if player owns a line in move's mini-board once move is played."""
+    r, c = move
+    idx = grid_index(board, r // 3, c // 3)
+    return bool(COMPLETED[player][idx] or WIN_CELLS[player][idx] >> ((r % 3) * 3 + c % 3) & 1)
 
 def play(board, prev_move, player):
     opponent = 2 if player == 1 else 1
@@ -29,20 +27,14 @@ def play(board, prev_move, player):
             valid_moves = [(r, c) for r in range(nr, nr+3) for c in range(nc, nc+3) if board[r][c] == 0]
 
     # Try to win local board
-    for r, c in valid_moves:
-        tr, tc = r // 3, c // 3
-        temp_board = get_local_board(board, tr, tc)
-        temp_board[r % 3][c % 3] = player
-        if check_win(temp_board, player):
-            return (r, c)
+    for move in valid_moves:
+        if wins_local(board, move, player):
+            return move
 
     # Try to block opponent
-    for r, c in valid_moves:
-        tr, tc = r // 3, c // 3
-        temp_board = get_local_board(board, tr, tc)
-        temp_board[r % 3][c % 3] = opponent
-        if check_win(temp_board, opponent):
-            return (r, c)
+    for move in valid_moves:
+        if wins_local(board, move, opponent):
+            return move
 
     # Else, just pick randomly
     return random.choice(valid_moves)
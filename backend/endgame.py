@@ -0,0 +1,148 @@
+# Exact endgame solver: alpha-beta negamax to the end of the game under the
+# full game rules (get_valid_moves() with won boards allowed), so the result
+# is proven whatever the opponent plays.
+#
+#   result = endgame.solve(pos, deadline=time.time() + 1.0)
+#   if result is not None:
+#       outcome, distance, move = result   # "win"/"draw"/"loss" for the side
+#                                           # to move, plies to the end, best move
+#
+# Scores are relative to the side to move: WIN - d for a win d plies from
+# here, -(WIN - d) for a loss, 0 for a draw.  The winner takes the shortest
+# win and the loser the longest loss.  Because no score depends on the path
+# to a node, proven bounds are kept in a transposition table across calls:
+# later moves of the same game reuse the earlier proofs.  A caller that needs
+# a result independent of earlier solves passes tables from new_tables().
+
+import time
+
+from move_ordering import MoveOrderer
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+WIN = 1000
+# Positions with at most this many empty cells are tried by should_solve();
+# up to ~16 they solve in well under a second, around 20 some take minutes,
+# so callers pass a deadline and fall back to their search on None.
+SOLVE_EMPTY = 20
+TT_MEGABYTES = 16
+
+table = TranspositionTable(TT_MEGABYTES)
+ordering = MoveOrderer()
+stats = {"nodes": 0, "solved": 0, "aborted": 0}
+
+
+class SolveTimeout(Exception):
+    pass
+
+
+def should_solve(pos):
+    """Whether an exact solve is worth trying: few empty cells left."""
+    return pos.count_empty() <= SOLVE_EMPTY
+
+
+def outcome(score):
+    """("win" | "draw" | "loss", plies to the end) of a solver score."""
+    if score > 0:
+        return "win", WIN - score
+    if score < 0:
+        return "loss", WIN + score
+    return "draw", None
+
+
+def new_tables():
+    """Empty (table, ordering) for solve(), instead of the shared ones."""
+    return TranspositionTable(TT_MEGABYTES), MoveOrderer()
+
+
+def solve(pos, deadline=None, max_nodes=None, tables=None):
+    """(outcome, distance, best move) of pos for the side to move, or None if
+    the deadline or max_nodes hit first.  pos must not be finished; it is left
+    unchanged."""
+    undo = len(pos._undo)
+    tt, orderer = tables or (table, ordering)
+    orderer.new_search()
+    tt.new_search()
+    counter = [0, max_nodes or float("inf")]
+    try:
+        score = _negamax(pos, -WIN, WIN, 0, deadline or float("inf"), counter, tt, orderer)
+    except SolveTimeout:
+        while len(pos._undo) > undo:
+            pos.pop()
+        stats["aborted"] += 1
+        return None
+    finally:
+        stats["nodes"] += counter[0]
+    stats["solved"] += 1
+    result, distance = outcome(score)
+    return result, distance, tt.probe(pos.key)[3]
+
+
+def _negamax(pos, alpha, beta, ply, deadline, counter, table, ordering):
+    """Score of pos for the side to move, within (alpha, beta)."""
+    counter[0] += 1
+    if counter[0] & 1023 == 0 and (time.time() > deadline or counter[0] > counter[1]):
+        raise SolveTimeout
+    winner = pos.get_winner()
+    if winner is not None:
+        return 0 if winner == 3 else -WIN  # the side that just moved won
+
+    # A node can't end sooner than next ply, which bounds both sides' scores
+    if alpha < -WIN + 1:
+        alpha = -WIN + 1
+        if alpha >= beta:
+            return alpha
+    if beta > WIN - 1:
+        beta = WIN - 1
+        if alpha >= beta:
+            return beta
+
+    key = pos.key
+    entry = table.probe(key)
+    hash_move = None
+    if entry is not None:
+        _, flag, value, hash_move = entry
+        if flag == EXACT:
+            return value
+        if flag == LOWER and value >= beta:
+            return value
+        if flag == UPPER and value <= alpha:
+            return value
+
+    alpha_orig = alpha
+    best, best_move = -WIN - 1, None
+    for move in ordering.order(pos, pos.get_valid_moves(), ply, hash_move):
+        pos.push(move)
+        # The child's score seen from here, one ply further from the end
+        score = -_negamax(pos, _child(beta), _child(alpha), ply + 1, deadline, counter,
+                          table, ordering)
+        pos.pop()
+        if score > 0:
+            score -= 1
+        elif score < 0:
+            score += 1
+        if score > best:
+            best, best_move = score, move
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    ordering.cutoff(move, ply, pos.curr_player, 1)
+                    break
+
+    if best <= alpha_orig:
+        flag = UPPER
+    elif best >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table.store(key, 0, flag, best, best_move)
+    return best
+
+
+def _child(bound):
+    """A bound on our score as the matching bound on the child's score, the
+    inverse of the one-ply shift applied to child scores in _negamax."""
+    if bound > 0:
+        return -(bound + 1)
+    if bound < 0:
+        return -(bound - 1)
+    return 0
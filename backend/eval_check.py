@@ -0,0 +1,75 @@
+# Checks ultimate.py's incremental evaluation against the from-scratch one:
+# plays random games with EvalPosition.push(), compares evaluate() with
+# evaluate_full() for both players at every position, then undoes the game
+# with pop() and compares again on the way back to the start.
+#
+#   python eval_check.py                  # ~220k positions, the usual check
+#   python eval_check.py --games 100 --seed 7
+#
+# Run it after changing evaluate_full() or the tables EvalPosition is built
+# from (BOARD_SCORE, LINE_SCORE); exits non-zero on the first mismatch.
+
+import argparse
+import random
+import sys
+import time
+
+import ultimate
+
+
+def check(pos):
+    """None if both players' incremental scores match, else a description."""
+    for player in (1, 2):
+        fast, full = ultimate.evaluate(pos, player), ultimate.evaluate_full(pos, player)
+        if fast != full:
+            return f"player {player}: evaluate() {fast}, evaluate_full() {full}"
+    return None
+
+
+def check_game(rng):
+    """Positions checked in one random game; raises AssertionError on a mismatch."""
+    pos = ultimate.EvalPosition()
+    checked = 0
+    plies = []
+    while True:
+        error = check(pos)
+        checked += 1
+        if error:
+            raise AssertionError(f"after {plies}: {error}")
+        if pos.get_winner() is not None:
+            break
+        move = rng.choice(pos.get_valid_moves())
+        pos.push(move)
+        plies.append(move)
+    while plies:
+        pos.pop()
+        plies.pop()
+        error = check(pos)
+        checked += 1
+        if error:
+            raise AssertionError(f"back at {plies}: {error}")
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental vs full evaluation check")
+    parser.add_argument("--games", type=int, default=1700)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    checked = 0
+    start = time.perf_counter()
+    try:
+        for _ in range(args.games):
+            checked += check_game(rng)
+    except AssertionError as e:
+        print(f"MISMATCH {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games, {checked} positions: evaluate() == evaluate_full() "
+          f"for both players ({elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Difficulty levels served by the app: a bot module played at a fixed search
+# budget (nodes for the alpha-beta bots, playouts for mcts).  A level then
+# plays at the same strength whatever the server load.  Each module's
+# TIME_LIMIT stays in force as a safety cap on a badly overloaded machine.
+#
+# Levels are unseeded by default, so the bots keep their tables (and mcts
+# its tree) from move to move and can ponder.  With LEVEL_SEED set every
+# search level plays seeded instead: a position always gets the same move,
+# so games can be replayed, but each move searches from empty tables.
+#
+#   python benchmark.py levels    # measure every level, rewrite LATENCY_PATH
+#
+# The benchmark's p50/p99 think times per level are published in
+# level_latency.json next to this file and served by GET /levels, for
+# capacity planning per difficulty.  Re-run it after changing a budget.
+
+import importlib
+import json
+import os
+
+LATENCY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "level_latency.json")
+LEVEL_SEED = int(os.environ["LEVEL_SEED"]) if os.environ.get("LEVEL_SEED") else None
+
+
+class BotLevel:
+    """A bot module with a budget and seed bound into its play().  ponder()
+    is offered only when unseeded: a seeded play() ignores the shared tables
+    pondering fills."""
+
+    def __init__(self, module_name, budget=None, seed=None):
+        self.module_name = module_name
+        self.budget = budget
+        self.seed = seed
+        self.module = importlib.import_module(module_name)
+        if seed is None and hasattr(self.module, "ponder"):
+            self.ponder = self.module.ponder
+
+    def play(self, board, prev_move, player):
+        options = {}
+        if self.budget is not None:
+            options["budget"] = self.budget
+        if self.seed is not None:
+            options["seed"] = self.seed
+        return self.module.play(board, prev_move, player, **options)
+
+    def __repr__(self):
+        return f"BotLevel({self.module_name!r}, budget={self.budget}, seed={self.seed})"
+
+
+# Budgets sized for a p50 around 1 s on one core of the benchmark machine and
+# a p99 near half of each module's TIME_LIMIT, so that the budget, not the
+# cap, decides the move even on a busy server
+BOT_MODULES = {
+    "Very Easy": BotLevel("very_easy"),
+    "Easy": BotLevel("easy"),
+    "Medium": BotLevel("medium", budget=20000, seed=LEVEL_SEED),
+    "Hard": BotLevel("hard", budget=120000, seed=LEVEL_SEED),
+    "Ultimate": BotLevel("ultimate", budget=120000, seed=LEVEL_SEED),
+    "MCTS": BotLevel("mcts", budget=6000, seed=LEVEL_SEED),
+}
+
+
+def published_latency(path=LATENCY_PATH):
+    """{level: {"p50": s, "p99": s, ...}} from the last benchmark run."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,117 @@
+# Background runner for Bot vs Bot matches.
+#
+# /bot-vs-bot-run used to play the whole game inside the request.  Matches now
+# run on a small bounded thread pool so the request returns a job id at once
+# and web workers stay free for interactive /move traffic; clients poll the
+# job for the moves played so far and the final result.  Restarting a game
+# cancels its job: the match stops at its next move.  Which job plays a game
+# is recorded in the game's session (see start_match in app.py), so every
+# worker process sharing the session store agrees on it.
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENT_MATCHES = int(os.environ.get("MAX_CONCURRENT_MATCHES", 2))
+JOB_RETENTION = 30 * 60  # seconds a finished job can still be polled
+
+
+class JobCancelled(Exception):
+    """Raised by record() inside a job that was cancelled."""
+
+
+class MatchJobs:
+    def __init__(self, max_workers=MAX_CONCURRENT_MATCHES):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bot-match")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # new move or job finished
+
+    def submit(self, game_id, run, job_id=None):
+        """Queue run(record) for game_id and return the job id (job_id if
+        given, else a new one).
+
+        run is called on a pool thread; it reports each move through
+        record(entry) and returns the final result dict."""
+        with self._lock:
+            self._prune()
+            job = {
+                "id": job_id or str(uuid.uuid4()),
+                "game_id": game_id,
+                "status": "queued",
+                "moves": [],
+                "result": None,
+                "error": None,
+                "created": time.time(),
+                "finished": None,
+            }
+            self._jobs[job["id"]] = job
+        self._pool.submit(self._run, job, run)
+        return job["id"]
+
+    def _run(self, job, run):
+        def record(entry):
+            with self._lock:
+                if job["status"] == "cancelled":
+                    raise JobCancelled
+                job["moves"].append(entry)
+                self._changed.notify_all()
+
+        with self._lock:
+            if job["status"] == "cancelled":
+                return
+            job["status"] = "running"
+        try:
+            result = run(record)
+        except JobCancelled:
+            with self._lock:
+                job["status"] = "cancelled"
+        except Exception as e:
+            with self._lock:
+                if job["status"] != "cancelled":
+                    job["status"], job["error"] = "failed", str(e)
+        else:
+            with self._lock:
+                if job["status"] != "cancelled":
+                    job["status"], job["result"] = "done", result
+        finally:
+            with self._lock:
+                if job["finished"] is None:
+                    job["finished"] = time.time()
+                self._changed.notify_all()
+
+    def cancel(self, game_id):
+        """Cancel the queued or running jobs of game_id.  A running match
+        stops when it records its next move."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job["game_id"] == game_id and job["status"] in ("queued", "running"):
+                    job["status"], job["finished"] = "cancelled", time.time()
+            self._changed.notify_all()
+
+    def snapshot(self, job_id, since=0):
+        """Copy of the job with only the moves from index since on, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(job, moves=job["moves"][since:], moves_played=len(job["moves"]))
+
+    def wait(self, job_id, since=0, timeout=None):
+        """Like snapshot(), but first blocks until the job has more than
+        `since` moves or has finished (or timeout seconds pass)."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: job_id not in self._jobs
+                or len(self._jobs[job_id]["moves"]) > since
+                or self._jobs[job_id]["finished"] is not None,
+                timeout)
+        return self.snapshot(job_id, since)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [j["id"] for j in self._jobs.values()
+                       if j["finished"] and j["finished"] < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,183 @@
+#monte carlo tree search (UCT) instead of a hand-tuned evaluate()
+
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from mini_tables import FULL, TERNARY, WIN_CELLS
+from ultimate_ttt_engine import CELLS, DRAW, UltimateTTT
+
+TIME_LIMIT = 3.0
+PLAYOUT_LIMIT = None   # stop after this many playouts as well, if set
+EXPLORATION = 1.4
+GUIDED_PLAYOUTS = True  # take an immediate mini-board win when one is forced
+PONDER_LIMIT = 60.0     # a ponder() nobody stops gives up after this many seconds
+
+# Filled in by every play() call; playouts_per_second is the number to compare
+# against the alpha-beta bots' nodes/second at the same TIME_LIMIT.
+stats = {"playouts": 0, "seconds": 0.0, "playouts_per_second": 0.0, "reused_visits": 0}
+
+# Trees kept for reuse, by the position they start from: after play() the
+# subtree of its move and each reply's subtree below it.  Each group belongs
+# to one game and is handed to one play() or ponder() at a time (taking any
+# of its nodes drops the whole group), so concurrent games never search the
+# same nodes.  The oldest groups are dropped past KEPT_TREES.
+_trees = OrderedDict()  # token -> {position key: Node}
+_trees_lock = threading.Lock()
+KEPT_TREES = 16
+
+
+class Node:
+    __slots__ = ("move", "parent", "player", "key", "children", "untried", "wins", "visits")
+
+    def __init__(self, pos, rng, move=None, parent=None):
+        self.move = move
+        self.parent = parent
+        self.player = 3 - pos.curr_player  # who played move; wins are counted for them
+        self.key = pos.key
+        self.children = []
+        self.untried = pos.get_valid_moves() if pos.get_winner() is None else []
+        rng.shuffle(self.untried)
+        self.wins = 0.0
+        self.visits = 0
+
+    def select_child(self):
+        log_n = math.log(self.visits or 1)
+        return max(self.children,
+                   key=lambda c: c.wins / c.visits + EXPLORATION * math.sqrt(log_n / c.visits)
+                   if c.visits else math.inf)
+
+
+def play(board, prev_move, player, budget=None, seed=None):
+    """budget: playouts instead of PLAYOUT_LIMIT, TIME_LIMIT remaining a
+    safety cap; seed: makes the move depend only on the arguments (the
+    previous move's tree is not reused)."""
+    start_time = time.time()
+    # Source of the shuffles and playout moves, of this call only
+    rng = random if seed is None else random.Random(seed)
+    limit = PLAYOUT_LIMIT if budget is None else budget
+
+    pos = UltimateTTT.from_board(board, prev_move, player)
+    root = _take_tree(pos.key) if seed is None else None
+    stats["reused_visits"] = root.visits if root else 0
+    if root is None:
+        root = Node(pos, rng)
+    root.parent = None
+
+    playouts = 0
+    while limit is None or playouts < limit:
+        if playouts % 16 == 0 and time.time() - start_time > TIME_LIMIT:
+            break
+        iterate(root, pos, rng)
+        playouts += 1
+
+    elapsed = time.time() - start_time
+    stats.update(playouts=playouts, seconds=elapsed,
+                 playouts_per_second=playouts / elapsed if elapsed else 0.0)
+
+    if not root.children:
+        return rng.choice(pos.get_valid_moves())
+    best = max(root.children, key=lambda c: c.visits)
+    if seed is None:
+        _keep_tree(best)
+    return best.move
+
+
+def ponder(board, prev_move, player, stop):
+    """Think on the opponent's time: `player` is to move.  Keeps growing the
+    tree below our last move (taken out of the kept trees, so no play() can
+    use it meanwhile) until the stop Event is set, then keeps it again so
+    play() finds the real reply already explored.  Returns the number of
+    playouts."""
+    start_time = time.time()
+    pos = UltimateTTT.from_board(board, prev_move, player)
+    root = _take_tree(pos.key) or Node(pos, random)
+    root.parent = None
+
+    playouts = 0
+    while not stop.is_set():
+        if playouts % 16 == 0 and time.time() - start_time > PONDER_LIMIT:
+            break
+        iterate(root, pos, random)
+        playouts += 1
+    _keep_tree(root)
+    return playouts
+
+
+def _keep_tree(node):
+    """Keep the tree below our move for reuse: under its own key for
+    ponder() and under each reply's for the next play()."""
+    nodes = {child.key: child for child in node.children}
+    nodes[node.key] = node
+    with _trees_lock:
+        _trees[object()] = nodes
+        while len(_trees) > KEPT_TREES:
+            _trees.popitem(last=False)
+
+
+def _take_tree(key):
+    """The kept node for the position with this key, or None; its group is
+    no longer offered to anyone else."""
+    with _trees_lock:
+        for token, nodes in _trees.items():
+            if key in nodes:
+                del _trees[token]
+                return nodes[key]
+    return None
+
+
+def iterate(root, pos, rng=random):
+    """One select / expand / playout / backpropagate pass; pos is restored."""
+    node = root
+    depth = 0
+    while not node.untried and node.children:
+        node = node.select_child()
+        pos.push(node.move)
+        depth += 1
+
+    if node.untried:
+        move = node.untried.pop()
+        pos.push(move)
+        depth += 1
+        child = Node(pos, rng, move, node)
+        node.children.append(child)
+        node = child
+
+    winner = playout(pos, rng)
+
+    while node is not None:
+        node.visits += 1
+        if winner == node.player:
+            node.wins += 1
+        elif winner == DRAW:
+            node.wins += 0.5
+        node = node.parent
+
+    for _ in range(depth):
+        pos.pop()
+
+
+def playout(pos, rng=random):
+    """Play random moves to the end of the game, undo them, return the winner."""
+    plies = 0
+    winner = pos.get_winner()
+    masks = pos.masks
+    while winner is None:
+        move = None
+        b = pos.forced
+        if GUIDED_PLAYOUTS and b is not None:
+            p = pos.curr_player
+            xm, om = masks[1][b], masks[2][b]
+            wins = WIN_CELLS[p][TERNARY[xm] + 2 * TERNARY[om]] & (FULL ^ (xm | om))
+            if wins:
+                move = CELLS[b][wins][0]
+        if move is None:
+            move = rng.choice(pos.get_valid_moves())
+        pos.push(move)
+        plies += 1
+        winner = pos.get_winner()
+    for _ in range(plies):
+        pos.pop()
+    return winner
@@ -2,101 +2,57 @@
 
 import time
 import random
-import copy
+
+from move_ordering import MoveOrderer
+from position_bias import OPP_PENALTY, OWN_BONUS
+import search
+import telemetry
+from ultimate_ttt_engine import UltimateTTT
 
 MAX_DEPTH = 5
 TIME_LIMIT = 3.9  # leave a buffer
 
-start_time = None
-
-def play(board, prev_move, player):
-    global start_time
-    start_time = time.time()
-
-    valid_moves = get_valid_moves(board, prev_move, board)
-
-    best_score = float("-inf")
-    best_move = random.choice(valid_moves)
-
-    for move in valid_moves:
-        temp_board = copy.deepcopy(board)
-        make_move(temp_board, move, player)
-        score = minimax(temp_board, move, MAX_DEPTH - 1, False, player, float("-inf"), float("inf"))
-        if score > best_score:
-            best_score = score
-            best_move = move
-
+# Killers and history kept across unseeded play() calls
+ordering = MoveOrderer()
+
+def play(board, prev_move, player, budget=None, seed=None):
+    """budget: search nodes instead of TIME_LIMIT (which remains a safety
+    cap); seed: makes the move depend only on the arguments, by searching
+    with move ordering tables of its own."""
+    if seed is None:
+        ordering.new_search()
+    search.start(time.time() + TIME_LIMIT, ordering if seed is None else MoveOrderer(),
+                 telemetry=telemetry.current(), max_nodes=search.INF if budget is None else budget)
+
+    pos = UltimateTTT.from_board(board, prev_move, player)
+    valid_moves = pos.get_valid_moves()
+    best_move, _ = search.deepen(
+        pos, valid_moves,
+        lambda depth: search.pv_search_root(pos, valid_moves, depth, player, evaluate),
+        MAX_DEPTH, (random if seed is None else random.Random(seed)).choice(valid_moves))
     return best_move
 
-def minimax(board, prev_move, depth, maximizing, player, alpha, beta):
-    global start_time
-
-    if time.time() - start_time > TIME_LIMIT or depth == 0:
-        return evaluate(board, player)
-
-    valid_moves = get_valid_moves(board, prev_move, board)
-    if not valid_moves:
-        return evaluate(board, player)
-
-    if maximizing:
-        max_eval = float("-inf")
-        for move in valid_moves:
-            temp_board = copy.deepcopy(board)
-            make_move(temp_board, move, player)
-            eval = minimax(temp_board, move, depth-1, False, player, alpha, beta)
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval
-    else:
-        min_eval = float("inf")
-        opp = 2 if player == 1 else 1
-        for move in valid_moves:
-            temp_board = copy.deepcopy(board)
-            make_move(temp_board, move, opp)
-            eval = minimax(temp_board, move, depth-1, True, player, alpha, beta)
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval
-
-def evaluate(board, player):
+def evaluate(pos, player):
     opp = 2 if player == 1 else 1
     score = 0
+    mainboard = pos.status
+    xs, os_ = pos.masks[1], pos.masks[2]
+    own_masks = xs if player == 1 else os_
+    opp_masks = os_ if player == 1 else xs
 
-    position_weights = [
-        [2, 1, 2],
-        [1, 3, 1],
-        [2, 1, 2]
-    ]
-
-    # Step 1: Simulate mainboard from local wins
-    mainboard = [[0 for _ in range(3)] for _ in range(3)]
+    for b in range(9):
+        winner = mainboard[b]
 
-    for i in range(3):
-        for j in range(3):
-            mini = [[board[i * 3 + x][j * 3 + y] for y in range(3)] for x in range(3)]
-            winner = check_local_winner(mini)
-            mainboard[i][j] = winner
+        # Add local win scores
+        if winner == player:
+            score += 50
+        elif winner == opp:
+            score -= 50
+        elif winner == 3:  # draw
+            score -= 10
 
-            # Add local win scores
-            if winner == player:
-                score += 50
-            elif winner == opp:
-                score -= 50
-            elif winner == 3:  # draw
-                score -= 10
-
-            # Position preference inside mini-board
-            for r in range(3):
-                for c in range(3):
-                    cell = mini[r][c]
-                    if cell == player:
-                        score += position_weights[r][c]
-                    elif cell == opp:
-                        score -= position_weights[r][c] // 2
+        # Position preference inside mini-board
+        score += OWN_BONUS[own_masks[b]] - OPP_PENALTY[opp_masks[b]]
 
     # Step 2: Score global alignment
     def score_line(a, b, c):
@@ -108,46 +64,11 @@ def evaluate(board, player):
             return -500
         return 0
 
-    for r in range(3):
-        score += score_line(mainboard[r][0], mainboard[r][1], mainboard[r][2])
+    for r in range(0, 9, 3):
+        score += score_line(mainboard[r], mainboard[r + 1], mainboard[r + 2])
     for c in range(3):
-        score += score_line(mainboard[0][c], mainboard[1][c], mainboard[2][c])
-    score += score_line(mainboard[0][0], mainboard[1][1], mainboard[2][2])
-    score += score_line(mainboard[0][2], mainboard[1][1], mainboard[2][0])
+        score += score_line(mainboard[c], mainboard[c + 3], mainboard[c + 6])
+    score += score_line(mainboard[0], mainboard[4], mainboard[8])
+    score += score_line(mainboard[2], mainboard[4], mainboard[6])
 
     return score
-
-
-
-def get_valid_moves(board, prev_move, full_board):
-    if prev_move is None:
-        return [(r, c) for r in range(9) for c in range(9) if board[r][c] == 0]
-
-    mr, mc = prev_move[0] % 3, prev_move[1] % 3
-    nr, nc = mr * 3, mc * 3
-
-    local_block = [full_board[r][nc:nc+3] for r in range(nr, nr+3)]
-    if all(cell != 0 for row in local_block for cell in row):
-        return [(r, c) for r in range(9) for c in range(9) if board[r][c] == 0]
-
-    return [(r, c) for r in range(nr, nr+3) for c in range(nc, nc+3) if board[r][c] == 0]
-
-def make_move(board, move, player):
-    r, c = move
-    board[r][c] = player
-
-
-def check_local_winner(mini):
-    for r in range(3):
-        if mini[r][0] == mini[r][1] == mini[r][2] != 0:
-            return mini[r][0]
-    for c in range(3):
-        if mini[0][c] == mini[1][c] == mini[2][c] != 0:
-            return mini[0][c]
-    if mini[0][0] == mini[1][1] == mini[2][2] != 0:
-        return mini[0][0]
-    if mini[0][2] == mini[1][1] == mini[2][0] != 0:
-        return mini[0][2]
-    if all(mini[i][j] != 0 for i in range(3) for j in range(3)):
-        return 3  # draw
-    return 0  # ongoing
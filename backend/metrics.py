@@ -0,0 +1,133 @@
+# In-process metrics in the Prometheus text format, served by GET /metrics.
+#
+#   requests = REGISTRY.counter("http_requests_total", "Requests", ("route", "status"))
+#   requests.inc("/move", "200")
+#   latency = REGISTRY.histogram("bot_think_seconds", "Think time", ("difficulty",))
+#   latency.observe(0.42, "Hard")
+#
+# No client library and no push gateway: each metric is a dict of label
+# values under one lock, and rendering walks them at scrape time.  Values are
+# per process; with several gunicorn workers every worker answers for itself.
+
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=(), callback=None):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.callback = callback  # unlabelled value read at scrape time, if set
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            if self.callback is not None:
+                self._values[()] = self.callback()
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels, value):
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"]
+
+
+class Counter(Metric):
+    """A total that only goes up: incremented by the app, or read from
+    callback() at scrape time when something else keeps the count."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """A value set by the app, or read from callback() at scrape time."""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # per bucket (the last one is +Inf), then the sum of values
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def _samples(self, labels, counts):
+        names = self.label_names + ("le",)
+        lines = []
+        total = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            total += n
+            lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {total}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(counts[-1])}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=(), callback=None):
+        return self._add(Counter(name, help, labels, callback))
+
+    def gauge(self, name, help, labels=(), callback=None):
+        return self._add(Gauge(name, help, labels, callback))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
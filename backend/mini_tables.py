@@ -0,0 +1,135 @@
+# Precomputed outcome and threat tables for a single 3x3 mini-board.
+#
+# A mini-board is indexed by its base-3 encoding: cell i = r * 3 + c holds
+# digit 0 (empty), 1 (X) or 2 (O), so index = sum(cell_i * 3 ** i).  From the
+# engine's two-mask form use index_of(xmask, omask).  Every table has one
+# entry for each of the 3 ** 9 = 19,683 encodings (impossible ones included).
+#
+#   STATUS[i]        0 = open, 1 = X won, 2 = O won, 3 = drawn (full)
+#   COMPLETED[p][i]  8-bit mask of LINES fully owned by player p
+#   TWOS[p][i]       8-bit mask of LINES with two p stones and one empty cell
+#   WIN_CELLS[p][i]  9-bit mask of empty cells that complete a line for p
+#
+# The tables are built once and cached next to this file in mini_tables.bin,
+# so later imports only read ~160 KB instead of rebuilding them.
+
+import os
+import sys
+from array import array
+
+N_STATES = 3 ** 9
+FULL = 0x1FF
+
+# Row, column, diagonal order matches the original check_small scan.
+LINES = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+ROWS_AND_COLUMNS = 0b00111111  # line-mask bits of the six straight lines
+
+# TERNARY[mask]: base-3 value of a 9-bit mask with every set bit as digit 1
+TERNARY = [sum(3 ** i for i in range(9) if mask >> i & 1) for mask in range(512)]
+POPCOUNT = bytes(bin(i).count("1") for i in range(512))
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mini_tables.bin")
+_MAGIC = b"UTTTMINI1"
+
+
+def index_of(xmask, omask):
+    return TERNARY[xmask] + 2 * TERNARY[omask]
+
+
+def mini_index(mini):
+    """Index of a 3x3 list-of-lists mini-board."""
+    a, b, c = mini
+    return (a[0] + 3 * a[1] + 9 * a[2] + 27 * b[0] + 81 * b[1] + 243 * b[2]
+            + 729 * c[0] + 2187 * c[1] + 6561 * c[2])
+
+
+def grid_index(board, br, bc):
+    """Index of mini-board (br, bc) of a 9x9 list-of-lists board."""
+    r, c = br * 3, bc * 3
+    a, b, d = board[r], board[r + 1], board[r + 2]
+    return (a[c] + 3 * a[c + 1] + 9 * a[c + 2] + 27 * b[c] + 81 * b[c + 1] + 243 * b[c + 2]
+            + 729 * d[c] + 2187 * d[c + 1] + 6561 * d[c + 2])
+
+
+def _build():
+    status = bytearray(N_STATES)
+    completed = (None, bytearray(N_STATES), bytearray(N_STATES))
+    twos = (None, bytearray(N_STATES), bytearray(N_STATES))
+    win_cells = (None, array("H", bytes(2 * N_STATES)), array("H", bytes(2 * N_STATES)))
+
+    for idx in range(N_STATES):
+        masks = [0, 0, 0]
+        n = idx
+        for i in range(9):
+            n, digit = divmod(n, 3)
+            if digit:
+                masks[digit] |= 1 << i
+        empty = FULL & ~(masks[1] | masks[2])
+
+        result = 0
+        for k, line in enumerate(LINES):
+            for p in (1, 2):
+                owned = masks[p] & line
+                if owned == line:
+                    completed[p][idx] |= 1 << k
+                    if not result:
+                        result = p
+                elif POPCOUNT[owned] == 2 and empty & line:
+                    twos[p][idx] |= 1 << k
+                    win_cells[p][idx] |= empty & line
+        if not result and not empty:
+            result = 3
+        status[idx] = result
+
+    return bytes(status), completed, twos, win_cells
+
+
+def _save(status, completed, twos, win_cells):
+    wx, wo = array("H", win_cells[1]), array("H", win_cells[2])
+    if sys.byteorder == "big":
+        wx.byteswap()
+        wo.byteswap()
+    blob = b"".join((_MAGIC, status, completed[1], completed[2], twos[1], twos[2],
+                     wx.tobytes(), wo.tobytes()))
+    tmp = f"{CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, CACHE_PATH)
+    except OSError:
+        pass  # read-only checkout: just rebuild next time
+
+
+def _load():
+    try:
+        with open(CACHE_PATH, "rb") as f:
+            blob = f.read()
+    except OSError:
+        return None
+    if not blob.startswith(_MAGIC) or len(blob) != len(_MAGIC) + 9 * N_STATES:
+        return None
+    view = memoryview(blob)[len(_MAGIC):]
+    parts = [bytes(view[i * N_STATES:(i + 1) * N_STATES]) for i in range(5)]
+    wins = []
+    for k in range(2):
+        a = array("H")
+        a.frombytes(view[5 * N_STATES + k * 2 * N_STATES:5 * N_STATES + (k + 1) * 2 * N_STATES])
+        if sys.byteorder == "big":
+            a.byteswap()
+        wins.append(a)
+    return parts[0], (None, parts[1], parts[2]), (None, parts[3], parts[4]), (None, wins[0], wins[1])
+
+
+def _init():
+    tables = _load()
+    if tables is None:
+        tables = _build()
+        _save(*tables)
+    return tables
+
+
+STATUS, COMPLETED, TWOS, WIN_CELLS = _init()
@@ -0,0 +1,88 @@
+# Move ordering for the alpha-beta bots (medium, hard, ultimate).
+#
+# Inside the tree moves are tried in this order:
+#   1. the hash move: the transposition table's best move, or the previous
+#      iteration's principal variation move for bots without a table
+#   2. moves that win their mini-board, then moves that block the
+#      opponent's win there
+#   3. the two killer moves of this ply (quiet moves that caused a beta
+#      cutoff in a sibling)
+#   4. everything else by history score (per side and cell, bumped by
+#      depth ** 2 on each cutoff), ties in generation order
+#
+#   ordering = MoveOrderer()
+#   ordering.new_search()                               # once per play()
+#   moves = ordering.order(pos, moves, ply, hash_move)
+#   ...on a beta cutoff by move: ordering.cutoff(move, ply, pos.curr_player, depth)
+
+from mini_tables import TERNARY, WIN_CELLS
+from ultimate_ttt_engine import CELLS
+
+HASH_MOVE = 1 << 30
+WIN = 1 << 29
+BLOCK = 1 << 28
+KILLER = 1 << 27  # the newer killer; the older one scores KILLER - 1
+MAX_PLY = 82
+
+BOARD_OF = [[(r // 3) * 3 + c // 3 for c in range(9)] for r in range(9)]
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [None, [[0] * 9 for _ in range(9)], [[0] * 9 for _ in range(9)]]
+
+    def clear(self):
+        """Forget everything, so the next search is independent of earlier ones."""
+        self.__init__()
+
+    def new_search(self):
+        """Forget the killers and age the history of the previous search."""
+        for slot in self.killers:
+            slot[0] = slot[1] = None
+        for side in (1, 2):
+            for row in self.history[side]:
+                for c in range(9):
+                    row[c] >>= 1
+
+    def order(self, pos, moves, ply, hash_move=None):
+        """moves of pos (side to move: pos.curr_player) sorted best first."""
+        player = pos.curr_player
+        history = self.history[player]
+        scores = [history[r][c] for r, c in moves]
+
+        # Later assignments take precedence: killers, blocks, wins, hash move
+        if ply < MAX_PLY:
+            killer1, killer2 = self.killers[ply]
+            if killer2 is not None and killer2 in moves:
+                scores[moves.index(killer2)] = KILLER - 1
+            if killer1 is not None and killer1 in moves:
+                scores[moves.index(killer1)] = KILLER
+        wins, blocks = WIN_CELLS[player], WIN_CELLS[3 - player]
+        xs, os_ = pos.masks[1], pos.masks[2]
+        boards = pos.forced
+        boards = {BOARD_OF[r][c] for r, c in moves} if boards is None else (boards,)
+        for b in boards:
+            idx = TERNARY[xs[b]] + 2 * TERNARY[os_[b]]
+            # Every empty cell of a board with any move in it is a move
+            for move in CELLS[b][blocks[idx]]:
+                scores[moves.index(move)] = BLOCK
+            for move in CELLS[b][wins[idx]]:
+                scores[moves.index(move)] = WIN
+        if hash_move is not None and hash_move in moves:
+            scores[moves.index(hash_move)] = HASH_MOVE
+
+        # A stable sort: equal scores keep generation order
+        ranked = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+        return [moves[i] for i in ranked]
+
+    def cutoff(self, move, ply, side, depth):
+        """Record that move (played by side) caused a beta cutoff."""
+        r, c = move
+        self.history[side][r][c] += depth * depth
+        if ply < MAX_PLY:
+            slot = self.killers[ply]
+            if slot[0] != move:
+                slot[1] = slot[0]
+                slot[0] = move
+
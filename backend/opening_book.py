@@ -0,0 +1,167 @@
+# Opening book for the hard and ultimate bots, built offline.
+#
+#   python opening_book.py build --plies 3 --depth 8   # rewrite opening_book.bin
+#   python opening_book.py show                        # summary of the book
+#
+# The builder enumerates every position up to --plies moves into the game,
+# keeps one of each set of symmetric positions (symmetry.canonical) and runs
+# ultimate's search on it to --depth.  Up to --choices moves scoring within
+# --margin of the best are stored, so bots can vary their openings.
+#
+# File format (little-endian): magic, then u16 plies, u32 positions, then per
+# position the 21-byte canonical key, a u8 count and count x (u8 cell
+# r * 9 + c in the canonical orientation, i16 score), best first.
+#
+# The book is read on the first lookup() (never, when the file is missing or
+# BOOK_PLIES is 0); a lookup costs one canonical() call and a dict probe.
+
+import argparse
+import os
+import random
+import struct
+import time
+
+import symmetry
+from ultimate_ttt_engine import UltimateTTT
+
+BOOK_PATH = os.environ.get("OPENING_BOOK", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "opening_book.bin"))
+# Positions later than this ply are never answered from the book (0 disables it)
+BOOK_PLIES = int(os.environ.get("BOOK_PLIES", 81))
+# Number of stored moves a lookup may pick from, at random (1 = best only)
+BOOK_VARIETY = int(os.environ.get("BOOK_VARIETY", 1))
+
+_MAGIC = b"UTTTBOOK1"
+HEADER = struct.Struct("<HI")
+ENTRY = struct.Struct("<21sB")
+CHOICE = struct.Struct("<Bh")
+
+_book = None  # canonical key -> [(cell, score), ...], best first; loaded lazily
+
+
+def read(path=BOOK_PATH):
+    """The book stored at path as a dict (empty if there is none)."""
+    book = {}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        data = b""
+    if data.startswith(_MAGIC):
+        offset = len(_MAGIC)
+        _, count = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        for _ in range(count):
+            key, n = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            book[int.from_bytes(key, "little")] = [
+                CHOICE.unpack_from(data, offset + i * CHOICE.size) for i in range(n)]
+            offset += n * CHOICE.size
+    return book
+
+
+def _load():
+    global _book
+    _book = read()
+    return _book
+
+
+def lookup(pos, variety=None, rng=random):
+    """A book move for pos, in pos's orientation, or None."""
+    if BOOK_PLIES <= 0 or 81 - pos.count_empty() > BOOK_PLIES:
+        return None
+    book = _book if _book is not None else _load()
+    if not book:
+        return None
+    key, t = symmetry.canonical(pos)
+    choices = book.get(key)
+    if not choices:
+        return None
+    cell, _ = rng.choice(choices[:variety or BOOK_VARIETY])
+    return symmetry.inverse_move((cell // 9, cell % 9), t)
+
+
+def save(book, plies, path=BOOK_PATH):
+    parts = [_MAGIC, HEADER.pack(plies, len(book))]
+    for key in sorted(book):
+        choices = book[key]
+        parts.append(ENTRY.pack(key.to_bytes(21, "little"), len(choices)))
+        parts += [CHOICE.pack(cell, score) for cell, score in choices]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(parts))
+    os.replace(tmp, path)
+
+
+def positions(plies):
+    """One position per symmetry class for every ply below plies."""
+    layer = {symmetry.canonical(UltimateTTT())[0]: UltimateTTT()}
+    for _ in range(plies):
+        yield from layer.values()
+        following = {}
+        for pos in layer.values():
+            for move in symmetry.unique_moves(pos, pos.get_valid_moves()):
+                pos.push(move)
+                if pos.get_winner() is None:
+                    key, t = symmetry.canonical(pos)
+                    following.setdefault(key, symmetry.transform(pos, t))
+                pos.pop()
+        layer = following
+
+
+def analyse(pos, depth):
+    """{move: score} from ultimate's search to depth, for the side to move."""
+    import ultimate
+
+    ultimate._set_limits(float("inf"))
+    ultimate.transposition_table.new_search()
+    ultimate.ordering.new_search()
+    root = ultimate.EvalPosition.from_board(pos.board, pos.last, pos.curr_player)
+    moves = symmetry.unique_moves(root, root.get_valid_moves(open_only=True) or root.get_valid_moves())
+    for d in range(1, depth + 1):
+        scores = ultimate.search_root(root, moves, d, pos.curr_player)
+        moves.sort(key=scores.get, reverse=True)
+    return scores
+
+
+def build(plies, depth, choices, margin, path=BOOK_PATH):
+    book = {}
+    start = time.time()
+    for pos in positions(plies):
+        scores = analyse(pos, depth)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best = ranked[0][1]
+        # The canonical position is its own orientation: moves are stored as is
+        key = symmetry.position_key(pos)
+        book[key] = [(r * 9 + c, max(-32768, min(32767, score)))
+                     for (r, c), score in ranked[:choices] if score >= best - margin]
+        print(f"{len(book):5} positions, {time.time() - start:7.1f}s", end="\r", flush=True)
+    print()
+    save(book, plies, path)
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ultimate TTT opening book")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="search the opening positions and write the book")
+    b.add_argument("--plies", type=int, default=3, help="book positions up to (not including) this ply")
+    b.add_argument("--depth", type=int, default=8, help="search depth per position")
+    b.add_argument("--choices", type=int, default=3, help="moves stored per position")
+    b.add_argument("--margin", type=int, default=15, help="score margin of the stored alternatives")
+    b.add_argument("--out", default=BOOK_PATH)
+    s = sub.add_parser("show", help="print a summary of the book")
+    s.add_argument("--book", default=BOOK_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.plies, args.depth, args.choices, args.margin, args.out)
+    path = args.out if args.command == "build" else args.book
+    book = read(path)
+    moves = sum(len(c) for c in book.values())
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    print(f"{path}: {len(book)} positions, {moves} moves, {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Perft for the Ultimate TTT move generators: counts the positions exactly
+# N plies deep (games that end earlier contribute nothing) from the start
+# position and from the saved positions in perft_reference.json, checks them
+# against the reference counts stored there and reports nodes/second.
+#
+#   python perft.py                       # check everything at reference depth
+#   python perft.py --generator list --depth 6
+#   python perft.py --update              # rewrite the counts after a deliberate rule change
+#
+# Generators, i.e. the move rules in use across the repo:
+#   engine  UltimateTTT.get_valid_moves() with push()/pop(): the game's rules,
+#           a won, drawn or full target board frees the move
+#   open    get_valid_moves(open_only=True), what the search bots (medium,
+#           hard, ultimate) generate: free moves skip won and drawn boards
+#   list    the 9x9 list rule of easy.py and very_easy.py: only a full target
+#           board frees the move; mini-board results come from check_small()
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from ultimate_ttt_engine import UltimateTTT, check_global, check_small
+
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perft_reference.json")
+
+
+def perft_engine(pos, depth, open_only=False):
+    """(positions at depth, nodes visited) below an UltimateTTT."""
+    if depth == 0:
+        return 1, 1
+    if pos.get_winner() is not None:
+        return 0, 1
+    leaves, nodes = 0, 1
+    for move in pos.get_valid_moves(open_only):
+        pos.push(move)
+        n, v = perft_engine(pos, depth - 1, open_only)
+        pos.pop()
+        leaves += n
+        nodes += v
+    return leaves, nodes
+
+
+def list_moves(board, prev_move):
+    """Legal moves under the rule of very_easy.play() / easy.play()."""
+    if not prev_move:
+        return [(r, c) for r in range(9) for c in range(9) if board[r][c] == 0]
+    nr, nc = prev_move[0] % 3 * 3, prev_move[1] % 3 * 3
+    moves = [(r, c) for r in range(nr, nr + 3) for c in range(nc, nc + 3) if board[r][c] == 0]
+    if not moves:
+        moves = [(r, c) for r in range(9) for c in range(9) if board[r][c] == 0]
+    return moves
+
+
+def perft_list(board, mainboard, prev_move, player, depth):
+    if depth == 0:
+        return 1, 1
+    if check_global(mainboard) != 0:
+        return 0, 1
+    leaves, nodes = 0, 1
+    for r, c in list_moves(board, prev_move):
+        br, bc = r // 3, c // 3
+        old = mainboard[br][bc]
+        board[r][c] = player
+        mainboard[br][bc] = check_small(board, br, bc)
+        n, v = perft_list(board, mainboard, (r, c), 3 - player, depth - 1)
+        board[r][c] = 0
+        mainboard[br][bc] = old
+        leaves += n
+        nodes += v
+    return leaves, nodes
+
+
+def run(generator, position, depth):
+    board = [[int(v) for v in position["board"][r * 9:r * 9 + 9]] for r in range(9)]
+    last = tuple(position["last"]) if position["last"] else None
+    player = position["player"]
+    if generator == "list":
+        mainboard = [[check_small(board, br, bc) for bc in range(3)] for br in range(3)]
+        return perft_list(board, mainboard, last, player, depth)
+    pos = UltimateTTT.from_board(board, last, player)
+    return perft_engine(pos, depth, open_only=generator == "open")
+
+
+GENERATORS = ("engine", "open", "list")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ultimate TTT perft")
+    parser.add_argument("--generator", choices=GENERATORS, action="append",
+                        help="generator to run (repeatable; default: all)")
+    parser.add_argument("--position", action="append", help="saved position name (default: all)")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="count only this depth (default: every reference depth)")
+    parser.add_argument("--update", action="store_true", help="store the counts as the new reference")
+    args = parser.parse_args()
+
+    with open(REFERENCE) as f:
+        reference = json.load(f)
+    failed = False
+    for generator in args.generator or GENERATORS:
+        counts = reference["counts"].setdefault(generator, {})
+        total_nodes = total_time = 0
+        for name in args.position or reference["positions"]:
+            position = reference["positions"][name]
+            expected = counts.get(name, [])
+            depths = [args.depth] if args.depth else range(1, reference["depth"][name] + 1)
+            for depth in depths:
+                start = time.perf_counter()
+                leaves, nodes = run(generator, position, depth)
+                elapsed = time.perf_counter() - start
+                total_nodes += nodes
+                total_time += elapsed
+                if depth <= len(expected):
+                    ok = expected[depth - 1] == leaves
+                    failed |= not ok
+                    check = "ok" if ok else f"MISMATCH, expected {expected[depth - 1]}"
+                else:
+                    check = "no reference"
+                if args.update:
+                    counts[name] = expected = expected[:depth - 1] + [leaves]
+                print(f"{generator:6} {name:9} depth {depth}: {leaves:>10} ({check})")
+        if total_time:
+            print(f"{generator}: {total_nodes} nodes in {total_time:.2f}s "
+                  f"-> {total_nodes / total_time:,.0f} nodes/s\n")
+
+    if args.update:
+        with open(REFERENCE, "w") as f:
+            json.dump(reference, f, indent=1)
+            f.write("\n")
+    sys.exit(1 if failed and not args.update else 0)
+
+
+if __name__ == "__main__":
+    main()
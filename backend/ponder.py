@@ -0,0 +1,72 @@
+# Background "pondering" for Player vs Bot games.
+#
+# After the bot replies, a bot module that defines
+#   ponder(board, prev_move, player, stop)
+# keeps searching the position on a daemon thread while the human thinks
+# (player is the human, who is to move).  The work lands in state the bot's
+# next play() reuses: the transposition table for ultimate, the game's own
+# search tree for mcts (which no other game's play() can take meanwhile).
+# The ponder searches a copy of the board and is stopped once the human's
+# move has been applied, before the bot replies, as well as when the game
+# restarts and when the session goes away; at most MAX_PONDER_THREADS run at
+# once across all games.
+
+import os
+import threading
+
+MAX_PONDER_THREADS = int(os.environ.get("MAX_PONDER_THREADS", 2))
+STOP_WAIT = 1.0  # seconds stop() waits for the search to notice
+
+
+class Ponderer:
+    def __init__(self, max_threads=MAX_PONDER_THREADS):
+        self.max_threads = max_threads
+        self._running = {}  # game_id -> (thread, stop Event)
+        self._lock = threading.Lock()
+        self.started = self.skipped = 0
+
+    def start(self, game_id, bot, board, prev_move, player):
+        """Ponder for game_id if the bot supports it and a thread is free;
+        returns whether a ponder was started."""
+        if not hasattr(bot, "ponder"):
+            return False
+        self.stop(game_id)
+        with self._lock:
+            if len(self._running) >= self.max_threads:
+                self.skipped += 1
+                return False
+            stop = threading.Event()
+            # The session's board changes under the thread with the next move
+            board = [row[:] for row in board]
+            thread = threading.Thread(target=self._run, name=f"ponder-{game_id}", daemon=True,
+                                      args=(game_id, bot, board, prev_move, player, stop))
+            self._running[game_id] = (thread, stop)
+            self.started += 1
+        thread.start()
+        return True
+
+    def _run(self, game_id, bot, board, prev_move, player, stop):
+        try:
+            bot.ponder(board, prev_move, player, stop)
+        except Exception:
+            pass  # pondering is best effort; play() will search from scratch
+        finally:
+            with self._lock:
+                if self._running.get(game_id, (None,))[0] is threading.current_thread():
+                    del self._running[game_id]
+
+    def stop(self, game_id, wait=True):
+        """Cancel the ponder of game_id, by default waiting until it has
+        returned so the bot's state is free for play()."""
+        with self._lock:
+            running = self._running.pop(game_id, None)
+        if running is None:
+            return
+        thread, stop = running
+        stop.set()
+        if wait:
+            thread.join(STOP_WAIT)
+
+    def active(self):
+        with self._lock:
+            return len(self._running)
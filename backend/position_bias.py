@@ -0,0 +1,21 @@
+# Positional bias of the alpha-beta evaluations (medium, hard, ultimate), per
+# 9-bit mask of one player's cells on a mini-board: own cells add their
+# weight, the opponent's subtract half of it.
+#
+#   score += OWN_BONUS[own_mask] - OPP_PENALTY[opp_mask]
+#
+# OWN_BONUS / OPP_PENALTY favour the centre, then the corners; a bot with
+# other weights builds its own pair with tables(weights).
+
+CENTRE_AND_CORNERS = [2, 1, 2, 1, 3, 1, 2, 1, 2]
+
+
+def tables(weights):
+    """(own bonus, opponent penalty) lists indexed by cell mask for the nine
+    cell weights (cell i = row * 3 + col)."""
+    own = [sum(weights[i] for i in range(9) if m >> i & 1) for m in range(512)]
+    opp = [sum(weights[i] // 2 for i in range(9) if m >> i & 1) for m in range(512)]
+    return own, opp
+
+
+OWN_BONUS, OPP_PENALTY = tables(CENTRE_AND_CORNERS)
@@ -0,0 +1,165 @@
+# Iterative-deepening alpha-beta shared by the search bots (medium, hard,
+# ultimate).
+#
+#   limits = search.start(deadline, orderer, telemetry=..., max_nodes=...)
+#   best, depth = search.deepen(pos, moves, search_root, MAX_DEPTH)
+#
+# deepen() runs search_root(depth) -> {move: score} for depth 1, 2, ...:
+# each finished depth yields a fully searched best move; hitting the
+# deadline, the node budget or the stop flag abandons the current depth and
+# keeps the last.  Inside the tree every node calls tick(), which counts it
+# and raises SearchTimeout when the search has to stop.
+#
+# medium and hard search with pv_search_root() / pv_minimax(): plain
+# alpha-beta that tries the previous iteration's principal variation first.
+# ultimate brings its own minimax() with a transposition table.
+
+import threading
+import time
+
+INF = float("inf")
+
+# Deadline, stop flag, node count and budget, move ordering tables, best
+# lines of the last finished depth and telemetry collector (None unless
+# collecting) of the search running on this thread: the server runs several
+# games' play() (and ultimate.ponder()) at once.
+limits = threading.local()
+_NEVER = threading.Event()
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def start(deadline, orderer, stop=None, telemetry=None, max_nodes=INF, **extra):
+    """Set up the limits of a new search on this thread and return them;
+    extra attributes (e.g. ultimate's table) are stored alongside."""
+    limits.deadline = deadline
+    limits.stop = stop or _NEVER
+    limits.telemetry = telemetry
+    limits.nodes = 0
+    limits.max_nodes = max_nodes
+    limits.ordering = orderer
+    limits.lines = {}  # root move -> best line below it, of the last finished depth
+    limits.pv = []     # the best of those lines, tried first by pv_minimax()
+    for name, value in extra.items():
+        setattr(limits, name, value)
+    return limits
+
+
+def tick():
+    """Count one node of the running search; raises SearchTimeout once it
+    is past its deadline or node budget, or was stopped."""
+    l = limits
+    l.nodes += 1
+    if l.nodes > l.max_nodes or time.time() > l.deadline or l.stop.is_set():
+        raise SearchTimeout
+    return l
+
+
+def order(pos, moves, ply, depth, hash_move):
+    """moves of pos best first, see move_ordering."""
+    if depth > 1:
+        return limits.ordering.order(pos, moves, ply, hash_move)
+    if hash_move in moves:
+        # Next to the leaves full ordering costs more than it saves
+        moves.remove(hash_move)
+        moves.insert(0, hash_move)
+    return moves
+
+
+def deepen(pos, moves, search_root, max_depth, best_move=None):
+    """Iterative deepening over the root moves until the limits say stop;
+    returns (best move, last depth completed).  search_root(depth) returns
+    {move: score}, or None if it ran out of time without raising.  moves end
+    up sorted best first; best_move is played if no depth completes."""
+    l = limits
+    search_start = time.time()  # later than play()'s start after a book or endgame try
+    completed = 0
+    if best_move is None:
+        best_move = moves[0]
+    for depth in range(1, min(max_depth, pos.count_empty()) + 1):
+        try:
+            scores = search_root(depth)
+        except SearchTimeout:
+            break
+        if scores is None:
+            break
+        completed = depth
+        # Previous iteration's best line first, the rest by score (stable sort)
+        moves.sort(key=scores.get, reverse=True)
+        best_move = moves[0]
+        l.pv = l.lines.get(best_move, [])
+        # The next depth would not finish in time (within the budget)
+        if l.max_nodes == INF and time.time() - search_start > (l.deadline - search_start) / 2:
+            break
+        if l.nodes > l.max_nodes / 2:
+            break
+
+    if l.telemetry is not None:
+        l.telemetry.depth = completed
+    return best_move, completed
+
+
+def pv_search_root(pos, moves, depth, player, evaluate, penalties=None):
+    """{move: score} of the root moves searched to depth by pv_minimax(),
+    each plus its penalty; the lines found go to limits.lines."""
+    scores, lines = {}, {}
+    best_score = -INF
+    for move in moves:
+        penalty = penalties[move] if penalties else 0
+        line = []
+        pos.push(move)
+        score = pv_minimax(pos, depth - 1, False, player, best_score - penalty, INF, 1, line,
+                           evaluate) + penalty
+        pos.pop()
+        scores[move], lines[move] = score, [move] + line
+        best_score = max(best_score, score)
+    limits.lines = lines
+    return scores
+
+
+def pv_minimax(pos, depth, maximizing, player, alpha, beta, ply, line, evaluate):
+    """Alpha-beta value of pos for player; fills line with the best
+    continuation found."""
+    l = tick()
+    t = l.telemetry
+    if t is not None:
+        t.nodes += 1
+    if depth == 0:
+        if t is not None:
+            t.evals += 1
+        return evaluate(pos, player)
+
+    valid_moves = pos.get_valid_moves()
+    if not valid_moves:
+        if t is not None:
+            t.evals += 1
+        return evaluate(pos, player)
+
+    pv = l.pv
+    valid_moves = order(pos, valid_moves, ply, depth, pv[ply] if ply < len(pv) else None)
+
+    best = -INF if maximizing else INF
+    for i, move in enumerate(valid_moves):
+        child = []
+        pos.push(move)
+        eval = pv_minimax(pos, depth - 1, not maximizing, player, alpha, beta, ply + 1, child,
+                          evaluate)
+        pos.pop()
+        if maximizing:
+            if eval > best:
+                best = eval
+                line[:] = [move] + child
+            alpha = max(alpha, eval)
+        else:
+            if eval < best:
+                best = eval
+                line[:] = [move] + child
+            beta = min(beta, eval)
+        if beta <= alpha:
+            l.ordering.cutoff(move, ply, pos.curr_player, depth)
+            if t is not None:
+                t.cutoff(i)
+            break
+    return best
@@ -0,0 +1,322 @@
+# Game session stores with idle expiry and an LRU cap.
+#
+# Sessions idle for longer than SESSION_TTL seconds are dropped by a
+# background sweeper; when more than MAX_SESSIONS are live the least recently
+# used one is evicted.  Ids of evicted sessions are remembered for a while so
+# the API can answer "expired" (410) instead of "invalid game id".
+#
+# SESSION_BACKEND picks where sessions live:
+#   memory  (default) live objects in this process; one gunicorn worker only
+#   sqlite  serialized into the SESSION_DB file, shared by every worker on the
+#           box.  Games are stored compactly (see pack_game) and bot modules
+#           are dropped and re-resolved by name when a session is loaded, so
+#           callers must put() a session back after changing it.
+
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+from ultimate_ttt_engine import UltimateTTT
+
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_DB = os.environ.get("SESSION_DB", "sessions.db")
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 60 * 60))
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", 10000))
+SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", 60))
+EXPIRED_MEMORY = 50000  # evicted ids remembered for 410 answers
+
+# Session keys holding bot modules; they are never serialized
+BOT_FIELDS = ("bot_module", "bot1", "bot2")
+
+# board (81 cells, row-major), mainboard (9), last move row/col (255 = none),
+# side to move
+GAME_STATE = struct.Struct("81s9sBBB")
+NO_MOVE = 255
+
+
+def pack_game(game):
+    cells = bytes(v for row in game.board for v in row)
+    last = game.last or (NO_MOVE, NO_MOVE)
+    return GAME_STATE.pack(cells, bytes(game.status), last[0], last[1], game.curr_player)
+
+
+def unpack_game(data):
+    cells, _, r, c, player = GAME_STATE.unpack(data)
+    board = [list(cells[i:i + 9]) for i in range(0, 81, 9)]
+    last = None if r == NO_MOVE else (r, c)
+    return UltimateTTT.from_board(board, last, player)
+
+
+def dump_session(session):
+    """(state, meta): the packed game and the JSON of every other plain field."""
+    meta = {k: v for k, v in session.items() if k != "game" and k not in BOT_FIELDS}
+    return pack_game(session["game"]), json.dumps(meta, separators=(",", ":"))
+
+
+def load_session(state, meta, resolve_bots=None):
+    session = json.loads(meta)
+    session["game"] = unpack_game(state)
+    if resolve_bots:
+        resolve_bots(session)
+    return session
+
+
+def session_size(session):
+    """approx_size() of the session's own state: the bot fields hold modules,
+    levels and sandbox proxies shared by every game, so they are left out."""
+    return approx_size({k: v for k, v in session.items() if k not in BOT_FIELDS})
+
+
+def approx_size(obj, seen=None):
+    """Rough deep sys.getsizeof; shared modules (bots) are not counted."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, (types.ModuleType, type)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(approx_size(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), seen)
+    return size
+
+
+class BaseSessionStore:
+    backend = None
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sweeper = None
+        self.on_evict = None  # called with the game_id of every evicted session
+
+    def start_sweeper(self, interval=SWEEP_INTERVAL):
+        if self._sweeper is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+
+class MemorySessionStore(BaseSessionStore):
+    backend = "memory"
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        super().__init__(ttl, max_sessions)
+        self._sessions = OrderedDict()   # game_id -> [session, last_access], LRU first
+        self._expired = OrderedDict()    # game_id -> eviction time
+        self._lock = threading.Lock()
+        self.evictions = {"ttl": 0, "lru": 0}
+
+    def get(self, game_id):
+        """Session for game_id (refreshing its last access), or None."""
+        with self._lock:
+            item = self._sessions.get(game_id)
+            if item is None:
+                return None
+            if time.time() - item[1] > self.ttl:
+                self._evict(game_id, "ttl")
+                return None
+            item[1] = time.time()
+            self._sessions.move_to_end(game_id)
+            return item[0]
+
+    def put(self, game_id, session):
+        with self._lock:
+            self._sessions[game_id] = [session, time.time()]
+            self._sessions.move_to_end(game_id)
+            self._expired.pop(game_id, None)
+            while len(self._sessions) > self.max_sessions:
+                self._evict(next(iter(self._sessions)), "lru")
+
+    def put_if(self, game_id, session, field, expected):
+        """put() only if the stored session's field equals expected (None
+        matches a missing field); returns whether it was stored."""
+        with self._lock:
+            item = self._sessions.get(game_id)
+            if item is None or item[0].get(field) != expected:
+                return False
+            item[:] = [session, time.time()]
+            self._sessions.move_to_end(game_id)
+            return True
+
+    def delete(self, game_id):
+        with self._lock:
+            self._sessions.pop(game_id, None)
+
+    def is_expired(self, game_id):
+        """True if game_id was a session that has since been evicted."""
+        with self._lock:
+            return game_id in self._expired
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self, game_id, reason):
+        del self._sessions[game_id]
+        if self.on_evict:
+            self.on_evict(game_id)
+        self.evictions[reason] += 1
+        self._expired[game_id] = time.time()
+        while len(self._expired) > EXPIRED_MEMORY:
+            self._expired.popitem(last=False)
+
+    def sweep(self):
+        """Drop every session idle for longer than the TTL; returns how many."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            stale = [gid for gid, (_, last) in self._sessions.items() if last < cutoff]
+            for game_id in stale:
+                self._evict(game_id, "ttl")
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            sessions = [s for s, _ in self._sessions.values()]
+            evictions = dict(self.evictions)
+        return {
+            "backend": self.backend,
+            "live_sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "evictions": evictions,
+            "approx_bytes": sum(session_size(s) for s in sessions),
+        }
+
+
+class SqliteSessionStore(BaseSessionStore):
+    """Serialized sessions in one SQLite file, shared by all worker processes.
+
+    get() returns a fresh copy each time; resolve_bots(session) is called on
+    it to put the bot modules back from the identifiers in the session."""
+
+    backend = "sqlite"
+
+    def __init__(self, path=SESSION_DB, resolve_bots=None, ttl=SESSION_TTL,
+                 max_sessions=MAX_SESSIONS):
+        super().__init__(ttl, max_sessions)
+        self.path = path
+        self.resolve_bots = resolve_bots
+        self._local = threading.local()  # one connection per thread
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, "
+                       "state BLOB NOT NULL, meta TEXT NOT NULL, last_access REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+            db.execute("CREATE TABLE IF NOT EXISTS expired (id TEXT PRIMARY KEY, at REAL NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS evictions (reason TEXT PRIMARY KEY, n INTEGER NOT NULL)")
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=10)
+        return db
+
+    def get(self, game_id):
+        db = self._db()
+        row = db.execute("SELECT state, meta, last_access FROM sessions WHERE id = ?",
+                         (game_id,)).fetchone()
+        if row is None:
+            return None
+        with db:
+            if time.time() - row[2] > self.ttl:
+                self._evict(db, [game_id], "ttl")
+                return None
+            db.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (time.time(), game_id))
+        return load_session(row[0], row[1], self.resolve_bots)
+
+    def put(self, game_id, session):
+        state, meta = dump_session(session)
+        db = self._db()
+        with db:
+            db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                       (game_id, state, meta, time.time()))
+            db.execute("DELETE FROM expired WHERE id = ?", (game_id,))
+            excess = len(self) - self.max_sessions
+            if excess > 0:
+                oldest = db.execute("SELECT id FROM sessions ORDER BY last_access LIMIT ?",
+                                    (excess,)).fetchall()
+                self._evict(db, [r[0] for r in oldest], "lru")
+
+    def put_if(self, game_id, session, field, expected):
+        state, meta = dump_session(session)
+        db = self._db()
+        with db:
+            cursor = db.execute("UPDATE sessions SET state = ?, meta = ?, last_access = ? "
+                                "WHERE id = ? AND json_extract(meta, ?) IS ?",
+                                (state, meta, time.time(), game_id, "$." + field, expected))
+        return cursor.rowcount == 1
+
+    def delete(self, game_id):
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM sessions WHERE id = ?", (game_id,))
+
+    def is_expired(self, game_id):
+        return self._db().execute("SELECT 1 FROM expired WHERE id = ?",
+                                  (game_id,)).fetchone() is not None
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _evict(self, db, game_ids, reason):
+        now = time.time()
+        db.executemany("DELETE FROM sessions WHERE id = ?", [(g,) for g in game_ids])
+        db.executemany("INSERT OR REPLACE INTO expired VALUES (?, ?)", [(g, now) for g in game_ids])
+        db.execute("INSERT INTO evictions VALUES (?, ?) "
+                   "ON CONFLICT (reason) DO UPDATE SET n = n + excluded.n", (reason, len(game_ids)))
+        if self.on_evict:
+            for game_id in game_ids:
+                self.on_evict(game_id)
+
+    def sweep(self):
+        cutoff = time.time() - self.ttl
+        db = self._db()
+        with db:
+            stale = [r[0] for r in db.execute("SELECT id FROM sessions WHERE last_access < ?",
+                                              (cutoff,))]
+            if stale:
+                self._evict(db, stale, "ttl")
+            db.execute("DELETE FROM expired WHERE id IN "
+                       "(SELECT id FROM expired ORDER BY at DESC LIMIT -1 OFFSET ?)",
+                       (EXPIRED_MEMORY,))
+        return len(stale)
+
+    def stats(self):
+        db = self._db()
+        live, size = db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(state) + LENGTH(meta)), 0) "
+                                "FROM sessions").fetchone()
+        evictions = {"ttl": 0, "lru": 0}
+        evictions.update(db.execute("SELECT reason, n FROM evictions"))
+        return {
+            "backend": self.backend,
+            "live_sessions": live,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "evictions": evictions,
+            "approx_bytes": size,
+        }
+
+
+def make_session_store(resolve_bots=None):
+    """The store selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == "sqlite":
+        return SqliteSessionStore(SESSION_DB, resolve_bots)
+    if SESSION_BACKEND != "memory":
+        raise ValueError(f"Unknown SESSION_BACKEND {SESSION_BACKEND!r}")
+    return MemorySessionStore()
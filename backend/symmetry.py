@@ -0,0 +1,124 @@
+# The 8 symmetries of the Ultimate TTT board (rotations and reflections of
+# the square).  Each one acts the same way on the macro grid and inside every
+# mini-board, so a transformed position plays exactly like the original.
+#
+#   key, t = symmetry.canonical(pos)          # same key for all 8 images of pos
+#   move = symmetry.inverse_move(book[key], t) # a move stored for the canonical
+#                                              # position, in pos's orientation
+#
+# Positions are compared by what the rules see: both players' cells, the
+# forced mini-board and the side to move (the last move only matters through
+# the forced board).  Transforms are numbered 0-7, 0 being the identity.
+#
+# One caveat: a mini-board where both players completed a line (possible,
+# free moves may go to won boards) counts for whoever owns the first line in
+# mini_tables.LINES order, and that order is not symmetric.  Positions
+# without such a board (see exact()) behave identically under every
+# transform; caches that must be exact deep into the game should check it.
+
+from mini_tables import COMPLETED, TERNARY
+from ultimate_ttt_engine import O, UltimateTTT
+
+# (i, j) -> (i', j') on a 3x3 grid
+_MAPS = (
+    lambda i, j: (i, j),          # identity
+    lambda i, j: (j, 2 - i),      # rotate 90 clockwise
+    lambda i, j: (2 - i, 2 - j),  # rotate 180
+    lambda i, j: (2 - j, i),      # rotate 270
+    lambda i, j: (i, 2 - j),      # mirror left-right
+    lambda i, j: (2 - i, j),      # mirror top-bottom
+    lambda i, j: (j, i),          # main diagonal
+    lambda i, j: (2 - j, 2 - i),  # anti-diagonal
+)
+
+# PERM[t][k]: where cell (or mini-board) k = i * 3 + j goes under transform t
+PERM = [[f(k // 3, k % 3)[0] * 3 + f(k // 3, k % 3)[1] for k in range(9)] for f in _MAPS]
+INVERSE = [PERM.index([PERM[t].index(k) for k in range(9)]) for t in range(8)]
+# MASK[t][m]: a 9-bit mask (cells of a mini-board, or mini-boards) transformed
+MASK = [[sum(1 << perm[k] for k in range(9) if m >> k & 1) for m in range(512)] for perm in PERM]
+
+
+def exact(pos):
+    """True if all 8 images of pos are equivalent under the engine's rules."""
+    xs, os_ = pos.masks[1], pos.masks[2]
+    for b in range(9):
+        idx = TERNARY[xs[b]] + 2 * TERNARY[os_[b]]
+        if COMPLETED[1][idx] and COMPLETED[2][idx]:
+            return False
+    return True
+
+
+def transform_move(move, t):
+    r, c = move
+    b = PERM[t][(r // 3) * 3 + c // 3]
+    i = PERM[t][(r % 3) * 3 + c % 3]
+    return (b // 3) * 3 + i // 3, (b % 3) * 3 + i % 3
+
+
+def inverse_move(move, t):
+    """The move that transform t maps onto move."""
+    return transform_move(move, INVERSE[t])
+
+
+def transformed_masks(pos, t):
+    """(X masks, O masks) of pos under transform t, indexed by new mini-board."""
+    perm, mask = PERM[t], MASK[t]
+    xs, os_ = [0] * 9, [0] * 9
+    for b in range(9):
+        xs[perm[b]] = mask[pos.masks[1][b]]
+        os_[perm[b]] = mask[pos.masks[2][b]]
+    return xs, os_
+
+
+def _key(xs, os_, forced, player):
+    key = 0
+    for b in range(9):
+        key = key << 18 | xs[b] << 9 | os_[b]
+    return (key << 4 | (9 if forced is None else forced)) << 1 | (player == O)
+
+
+def position_key(pos, t=0):
+    """Integer key of pos under transform t; equal keys mean equal positions."""
+    xs, os_ = transformed_masks(pos, t)
+    forced = None if pos.forced is None else PERM[t][pos.forced]
+    return _key(xs, os_, forced, pos.curr_player)
+
+
+def canonical(pos):
+    """(key, t): the smallest position_key over the 8 transforms and the
+    transform that gives it.  inverse_move(m, t) maps moves of the canonical
+    position back onto pos."""
+    return min((position_key(pos, t), t) for t in range(8))
+
+
+def transform(pos, t):
+    """A new UltimateTTT for pos under transform t (without undo history)."""
+    board = [[0] * 9 for _ in range(9)]
+    for r, row in enumerate(pos.board):
+        for c, v in enumerate(row):
+            if v:
+                tr, tc = transform_move((r, c), t)
+                board[tr][tc] = v
+    last = transform_move(pos.last, t) if pos.last else None
+    return UltimateTTT.from_board(board, last, pos.curr_player)
+
+
+def stabilizer(pos):
+    """Transforms other than the identity that leave pos unchanged."""
+    key = position_key(pos)
+    return [t for t in range(1, 8) if position_key(pos, t) == key]
+
+
+def unique_moves(pos, moves):
+    """moves without symmetric duplicates: when a symmetry of pos maps one
+    move onto another, both lead to equivalent positions and only the first
+    is kept.  Mostly useful early in the game."""
+    symmetries = stabilizer(pos) if exact(pos) else None
+    if not symmetries:
+        return list(moves)
+    seen, unique = set(), []
+    for move in moves:
+        if move not in seen:
+            unique.append(move)
+            seen.update(transform_move(move, t) for t in symmetries)
+    return unique
@@ -0,0 +1,134 @@
+# Opt-in search telemetry for the bots.
+#
+#   telemetry.start()            # before bot.play(), on the calling thread
+#   move = bot.play(board, prev_move, player)
+#   search = telemetry.stop()    # SearchTelemetry for that call, or None
+#
+# The search bots (medium, hard, ultimate) pick the collector up once per
+# play() and count into it; when nothing was started they skip all counting.
+# Bots without a search only get the wall time.  Aggregator keeps
+# per-difficulty histograms of many calls for tuning.
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Collect for every bot move in the server, not only for debug requests
+ENABLED = os.environ.get("SEARCH_TELEMETRY", "") not in ("", "0")
+
+MAX_MOVE_INDEX = 16  # cutoffs at a later move index are counted in the last slot
+
+_local = threading.local()
+
+
+class SearchTelemetry:
+    __slots__ = ("nodes", "depth", "tt_probes", "tt_hits", "cutoffs", "evals",
+                 "started", "seconds")
+
+    def __init__(self):
+        self.nodes = self.depth = self.tt_probes = self.tt_hits = self.evals = 0
+        self.cutoffs = [0] * MAX_MOVE_INDEX  # beta cutoffs by index of the cutting move
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def cutoff(self, index):
+        self.cutoffs[min(index, MAX_MOVE_INDEX - 1)] += 1
+
+    def to_dict(self):
+        total = sum(self.cutoffs)
+        last = max((i for i, n in enumerate(self.cutoffs) if n), default=-1)
+        return {
+            "nodes": self.nodes,
+            "depth": self.depth,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_hit_rate": self.tt_hits / self.tt_probes if self.tt_probes else None,
+            "beta_cutoffs": self.cutoffs[:last + 1],
+            "first_move_cutoff_rate": self.cutoffs[0] / total if total else None,
+            "evals": self.evals,
+            "seconds": round(self.seconds, 4),
+            "nodes_per_second": round(self.nodes / self.seconds) if self.seconds else None,
+        }
+
+
+def start():
+    _local.current = SearchTelemetry()
+    return _local.current
+
+
+def current():
+    """Collector of the play() running on this thread, or None."""
+    return getattr(_local, "current", None)
+
+
+def stop():
+    search = current()
+    _local.current = None
+    if search is not None:
+        search.seconds = time.perf_counter() - search.started
+    return search
+
+
+class Histogram:
+    """Counts of observations per upper bound (the last bucket is +inf)."""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def to_dict(self):
+        labels = [str(b) for b in self.bounds] + ["+inf"]
+        return {"buckets": dict(zip(labels, self.counts)), "count": self.total, "sum": self.sum}
+
+
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 4, 5)
+NODES_BUCKETS = (100, 1000, 10000, 50000, 100000, 250000, 500000, 1000000)
+DEPTH_BUCKETS = tuple(range(1, 21))
+RATE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+class Aggregator:
+    """Per-difficulty histograms of recorded SearchTelemetry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_bot = {}
+
+    def record(self, name, search):
+        with self._lock:
+            bot = self._by_bot.get(name)
+            if bot is None:
+                bot = self._by_bot[name] = {
+                    "seconds": Histogram(SECONDS_BUCKETS),
+                    "nodes": Histogram(NODES_BUCKETS),
+                    "depth": Histogram(DEPTH_BUCKETS),
+                    "tt_hit_rate": Histogram(RATE_BUCKETS),
+                    "beta_cutoffs": [0] * MAX_MOVE_INDEX,
+                    "evals": 0,
+                }
+            bot["seconds"].observe(search.seconds)
+            if search.nodes:
+                bot["nodes"].observe(search.nodes)
+                bot["depth"].observe(search.depth)
+                bot["evals"] += search.evals
+                for i, n in enumerate(search.cutoffs):
+                    bot["beta_cutoffs"][i] += n
+            if search.tt_probes:
+                bot["tt_hit_rate"].observe(search.tt_hits / search.tt_probes)
+
+    def to_dict(self):
+        with self._lock:
+            out = {}
+            for name, bot in self._by_bot.items():
+                out[name] = {k: v.to_dict() if isinstance(v, Histogram) else v
+                             for k, v in bot.items()}
+                out[name]["beta_cutoffs"] = list(bot["beta_cutoffs"])
+            return out
@@ -0,0 +1,213 @@
+# Headless tournaments between bot modules, spread over a process pool.
+#
+#   python tournament.py hard ultimate --games 40 --time-limit 1.0 --out results.jsonl
+#   python tournament.py uploaded_bots/minimax_strat1.py medium hard --gauntlet
+#
+# Bots are module names (importable from backend/) or paths to .py files with
+# the usual play(board, prev_move, player).  Every pairing is played with both
+# colours; each worker process loads every bot once and keeps it for all of
+# its games.  Finished games stream to the --out file (.jsonl or .csv) as they
+# complete, and a win/draw/loss matrix with 95% confidence intervals is
+# printed at the end.
+
+import argparse
+import csv
+import importlib
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from ultimate_ttt_engine import DRAW, UltimateTTT
+
+_bots = None  # per-worker loaded modules, in the order of the bot specs
+
+
+def load_bot(spec):
+    """Import a bot by module name or from a .py file path."""
+    if spec.endswith(".py"):
+        name = "bot_" + os.path.splitext(os.path.basename(spec))[0]
+        module_spec = importlib.util.spec_from_file_location(name, spec)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        return module
+    return importlib.import_module(spec)
+
+
+def bot_name(spec):
+    return os.path.splitext(os.path.basename(spec))[0]
+
+
+def play_game(bot_x, bot_o, verbose=False):
+    """Play one game; returns (winner, moves, reason).
+
+    A bot that raises or returns an illegal move forfeits, so winner is always
+    1, 2 or 3 (draw)."""
+    game = UltimateTTT()
+    bots = {1: bot_x, 2: bot_o}
+    moves = []
+    while True:
+        if verbose:
+            game.print_board()
+        winner = game.get_winner()
+        if winner is not None:
+            return winner, moves, "draw" if winner == DRAW else "win"
+
+        player = game.curr_player
+        try:
+            move = bots[player].play(game.board, game.last, player)
+        except Exception as e:
+            if verbose:
+                print(f"Player {player} crashed: {e}")
+            return 3 - player, moves, "crash"
+        if not move or not game.move(*move):
+            if verbose:
+                print(f"Invalid move by Player {player} at {move}. Player {3 - player} wins!")
+            return 3 - player, moves, "illegal"
+        moves.append([game.last[0], game.last[1]])
+
+
+def _init_worker(specs, time_limit):
+    global _bots
+    _bots = [load_bot(spec) for spec in specs]
+    if time_limit is not None:
+        for bot in _bots:
+            if hasattr(bot, "TIME_LIMIT"):
+                bot.TIME_LIMIT = time_limit
+
+
+def _play_task(task):
+    game_no, x, o, seed = task
+    random.seed(seed)
+    start = time.time()
+    winner, moves, reason = play_game(_bots[x], _bots[o])
+    return {"game": game_no, "x": x, "o": o, "winner": winner, "reason": reason,
+            "plies": len(moves), "seconds": round(time.time() - start, 3), "moves": moves}
+
+
+def schedule(n_bots, games, gauntlet=False):
+    """(x, o) index pairs: every pairing `games` times, colours alternating."""
+    if gauntlet:
+        pairings = [(0, j) for j in range(1, n_bots)]
+    else:
+        pairings = [(i, j) for i in range(n_bots) for j in range(i + 1, n_bots)]
+    tasks = []
+    for a, b in pairings:
+        for k in range(games):
+            tasks.append((a, b) if k % 2 == 0 else (b, a))
+    return tasks
+
+
+class ResultWriter:
+    """Streams finished games to a .jsonl or .csv file."""
+
+    FIELDS = ["game", "x", "o", "winner", "reason", "plies", "seconds", "moves"]
+
+    def __init__(self, path, names):
+        self.names = names
+        self.file = open(path, "w", newline="") if path else None
+        self.csv = None
+        if self.file and path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.file, fieldnames=self.FIELDS)
+            self.csv.writeheader()
+
+    def write(self, result):
+        if not self.file:
+            return
+        row = dict(result, x=self.names[result["x"]], o=self.names[result["o"]])
+        if self.csv:
+            row["moves"] = " ".join(f"{r}{c}" for r, c in row["moves"])
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def summarize(results, n_bots):
+    """matrix[i][j] = {"w", "d", "l", "score", "ci"} for bot i against bot j."""
+    matrix = [[None] * n_bots for _ in range(n_bots)]
+    for i in range(n_bots):
+        for j in range(n_bots):
+            if i == j:
+                continue
+            scores = []
+            for r in results:
+                if {r["x"], r["o"]} != {i, j}:
+                    continue
+                side = 1 if r["x"] == i else 2
+                scores.append(0.5 if r["winner"] == DRAW else float(r["winner"] == side))
+            if not scores:
+                continue
+            n = len(scores)
+            mean = sum(scores) / n
+            var = sum(s * s for s in scores) / n - mean * mean
+            matrix[i][j] = {
+                "w": scores.count(1.0), "d": scores.count(0.5), "l": scores.count(0.0),
+                "score": mean, "ci": 1.96 * math.sqrt(max(var, 0.0) / n),
+            }
+    return matrix
+
+
+def format_matrix(matrix, names):
+    width = max(len(n) for n in names) + 2
+    lines = ["W-D-L and score (95% CI) of the row bot against the column bot",
+             " " * width + "".join(n.ljust(24) for n in names)]
+    for i, name in enumerate(names):
+        cells = []
+        for cell in matrix[i]:
+            if cell is None:
+                cells.append("-".ljust(24))
+            else:
+                cells.append(f"{cell['w']}-{cell['d']}-{cell['l']} "
+                             f"{cell['score']:.2f}±{cell['ci']:.2f}".ljust(24))
+        lines.append(name.ljust(width) + "".join(cells))
+    return "\n".join(lines)
+
+
+def run_tournament(specs, games=10, gauntlet=False, workers=None, output=None,
+                   time_limit=None, seed=0):
+    """Play the schedule on a process pool; returns (results, matrix)."""
+    names = [bot_name(s) for s in specs]
+    tasks = [(k, x, o, seed + k) for k, (x, o) in enumerate(schedule(len(specs), games, gauntlet))]
+    writer = ResultWriter(output, names)
+    results = []
+    try:
+        with multiprocessing.Pool(workers or os.cpu_count(), initializer=_init_worker,
+                                  initargs=(specs, time_limit)) as pool:
+            for result in pool.imap_unordered(_play_task, tasks):
+                results.append(result)
+                writer.write(result)
+    finally:
+        writer.close()
+    return results, summarize(results, len(specs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ultimate TTT bot tournament")
+    parser.add_argument("bots", nargs="+", help="module names or .py files")
+    parser.add_argument("--games", type=int, default=10, help="games per pairing (colours alternate)")
+    parser.add_argument("--gauntlet", action="store_true", help="first bot plays each of the others")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--time-limit", type=float, default=None, help="override each bot's TIME_LIMIT")
+    parser.add_argument("--out", default=None, help="stream games to this .jsonl or .csv file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if len(args.bots) < 2:
+        parser.error("need at least two bots")
+    start = time.time()
+    results, matrix = run_tournament(args.bots, args.games, args.gauntlet, args.workers,
+                                     args.out, args.time_limit, args.seed)
+    print(format_matrix(matrix, [bot_name(s) for s in args.bots]))
+    print(f"\n{len(results)} games in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
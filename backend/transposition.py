@@ -0,0 +1,65 @@
+# Fixed-size transposition table keyed by UltimateTTT.key (64-bit Zobrist).
+#
+# Each bucket has two slots: slot 0 is depth-preferred (only replaced by a
+# deeper or equal search, or by anything once the entry is from an older
+# search), slot 1 is always-replace.  The table is meant to live for a whole
+# game session; call new_search() at the start of every move instead of
+# clearing it.
+#
+# A slot is one (key, depth, flag, value, move, generation) tuple, replaced in
+# a single assignment, so searches running on several threads (pondering,
+# concurrent games) never see a key paired with another position's entry.
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Rough CPython cost of one slot: the list pointer, the key int and the
+# (key, depth, flag, value, move, generation) tuple.
+ENTRY_BYTES = 160
+
+
+class TranspositionTable:
+    def __init__(self, megabytes=32):
+        slots = max(2, megabytes * 1024 * 1024 // ENTRY_BYTES)
+        buckets = 1 << (slots // 2).bit_length() - 1
+        self.mask = buckets - 1
+        self.slots = [None] * (2 * buckets)
+        self.generation = 0
+        self.probes = self.hits = self.stores = 0
+
+    def __len__(self):
+        return sum(e is not None for e in self.slots)
+
+    @property
+    def capacity(self):
+        return len(self.slots)
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.generation = 0
+
+    def probe(self, key):
+        """(depth, flag, value, move) stored for key, or None."""
+        self.probes += 1
+        i = (key & self.mask) << 1
+        slots = self.slots
+        entry = slots[i]
+        if entry is None or entry[0] != key:
+            entry = slots[i + 1]
+            if entry is None or entry[0] != key:
+                return None
+        self.hits += 1
+        return entry[1:5]
+
+    def store(self, key, depth, flag, value, move):
+        self.stores += 1
+        i = (key & self.mask) << 1
+        entry = (key, depth, flag, value, move, self.generation)
+        old = self.slots[i]
+        if (old is None or old[0] == key or depth >= old[1]
+                or old[5] != self.generation):
+            self.slots[i] = entry
+        else:
+            self.slots[i + 1] = entry
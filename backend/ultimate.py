@@ -2,21 +2,231 @@
 
 #strategy number 8!
 
+import atexit
+import multiprocessing
+import os
 import time
 import random
-import copy
-
-MAX_DEPTH = 6
+import threading
+from collections import OrderedDict
+
+import endgame
+from mini_tables import POPCOUNT, STATUS, TERNARY, TWOS
+from move_ordering import MoveOrderer
+import opening_book
+import position_bias
+import search
+from search import SearchTimeout
+import symmetry
+import telemetry
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+from ultimate_ttt_engine import UltimateTTT
+
+MAX_DEPTH = 81  # iterative deepening normally hits TIME_LIMIT long before this
 TIME_LIMIT = 3.8
-start_time = None
-transposition_table = {}
+TT_MEGABYTES = 32
+PONDER_LIMIT = 60.0  # a ponder() nobody stops gives up after this many seconds
+ENDGAME_SHARE = 0.25  # of TIME_LIMIT an exact endgame solve may use before searching
+# Processes that split the root moves of each iteration; 1 searches serially
+# in this process (deterministic, and the only mode on a single core).
+# Only time-limited searches split: play() with a budget, which is how every
+# level in levels.py (so every game the app serves) calls it, always searches
+# serially.  The pool is therefore only reachable by calling ultimate.play()
+# directly without a budget, as `python benchmark.py parallel` does.
+SEARCH_WORKERS = int(os.environ.get("ULTIMATE_WORKERS", 1))
+
+# Filled in by every play() call; "book" is set when the opening book gave
+# the move, "endgame" is the proven (outcome, distance) when the solver did
+stats = {"depth": 0, "workers": 1, "seconds": 0.0, "book": False, "endgame": None}
+
+# Positions ponder() searched, i.e. the key after each reply it considered,
+# per game: a play() on one of them continues that ponder, so it must not age
+# its entries into replaceable old-generation ones.  Other games' play()
+# calls age the table as usual.  Oldest ponders are dropped past PONDERED_MAX.
+_pondered = OrderedDict()  # root key -> ponder token
+_pondered_lock = threading.Lock()
+PONDERED_MAX = 4096
+
+# Kept across play() calls so later moves of a game reuse earlier searches.
+# Scores are from the searching player's side, so O's entries use a salted key.
+transposition_table = TranspositionTable(TT_MEGABYTES)
+PLAYER_SALT = [0, 0, 0x9E3779B97F4A7C15]
+# Killers and history; shared with ponder(), which only makes them less precise
+ordering = MoveOrderer()
+
+# Positional bias (see position_bias): edge cells count against their owner
+POSITION_WEIGHTS = [2, -2, 2, -2, 3, -2, 2, -2, 2]
+OWN_BONUS, OPP_PENALTY = position_bias.tables(POSITION_WEIGHTS)
+
+# evaluate() split into lookup tables so EvalPosition can keep it up to date
+# on every push().  BOARD_SCORE[p][idx]: the per-mini-board terms (status,
+# open twos, positional bias) for player p of mini-board state idx (see
+# mini_tables).  LINE_SCORE[p][a * 16 + b * 4 + c]: score_line() for p of a
+# macro line whose mini-boards have statuses a, b, c.
+def _board_score(player, xm, om):
+    opp = 3 - player
+    idx = TERNARY[xm] + 2 * TERNARY[om]
+    winner = STATUS[idx]
+    score = 50 if winner == player else -50 if winner == opp else -10 if winner == 3 else 0
+    score += 15 * POPCOUNT[TWOS[player][idx]] - 20 * POPCOUNT[TWOS[opp][idx]]
+    own, other = (xm, om) if player == 1 else (om, xm)
+    return score + OWN_BONUS[own] - OPP_PENALTY[other]
+
+def _line_score(player, a, b, c):
+    opp = 3 - player
+    if a == b == c == player:
+        return 300
+    if (a == b == player and c == 0) or (b == c == player and a == 0) or (a == c == player and b == 0):
+        return 100
+    if a == b == c == opp:
+        return -300
+    return 0
 
-def play(board, prev_move, player):
-    global start_time, transposition_table
+BOARD_SCORE = [None, [0] * 3 ** 9, [0] * 3 ** 9]
+for _xm in range(512):
+    for _om in range(512):
+        if not _xm & _om:
+            for _p in (1, 2):
+                BOARD_SCORE[_p][TERNARY[_xm] + 2 * TERNARY[_om]] = _board_score(_p, _xm, _om)
+del _xm, _om, _p
+LINE_SCORE = [None] + [[_line_score(p, a, b, c) for a in range(4) for b in range(4) for c in range(4)]
+                       for p in (1, 2)]
+MACRO_LINES = ((0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6))
+POW3 = [3 ** i for i in range(9)]
+
+class EvalPosition(UltimateTTT):
+    """UltimateTTT that keeps evaluate() for both players up to date: push()
+    rescores only the mini-board that changed (and the macro lines when its
+    status changed), pop() restores the previous scores."""
+
+    def __init__(self):
+        super().__init__()
+        self.local = (0, BOARD_SCORE[1][0] * 9, BOARD_SCORE[2][0] * 9)
+        self.glob = (0, 0, 0)
+        self._scores = []
+
+    @classmethod
+    def from_board(cls, board, last=None, curr_player=1):
+        pos = super().from_board(board, last, curr_player)
+        xs, os_ = pos.masks[1], pos.masks[2]
+        idx = [TERNARY[xs[b]] + 2 * TERNARY[os_[b]] for b in range(9)]
+        pos.local = (0, sum(BOARD_SCORE[1][i] for i in idx), sum(BOARD_SCORE[2][i] for i in idx))
+        pos.glob = pos._macro_scores()
+        return pos
+
+    def _macro_scores(self):
+        s = self.status
+        keys = [s[a] * 16 + s[b] * 4 + s[c] for a, b, c in MACRO_LINES]
+        return (0, sum(LINE_SCORE[1][k] for k in keys), sum(LINE_SCORE[2][k] for k in keys))
+
+    def push(self, move):
+        r, c = move
+        b = (r // 3) * 3 + c // 3
+        old = TERNARY[self.masks[1][b]] + 2 * TERNARY[self.masks[2][b]]
+        new = old + self.curr_player * POW3[(r % 3) * 3 + c % 3]
+        status = self.status[b]
+        local, glob = self.local, self.glob
+        self._scores.append((local, glob))
+        self.local = (0, local[1] + BOARD_SCORE[1][new] - BOARD_SCORE[1][old],
+                      local[2] + BOARD_SCORE[2][new] - BOARD_SCORE[2][old])
+        UltimateTTT.push(self, move)
+        if self.status[b] != status:
+            self.glob = self._macro_scores()
+
+    def pop(self):
+        self.local, self.glob = self._scores.pop()
+        return UltimateTTT.pop(self)
+
+_pool = None
+_pool_size = 0
+
+def _set_limits(deadline, stop=None, telemetry=None, max_nodes=search.INF,
+                table=None, move_orderer=None):
+    """search.start() with the shared tables unless others are given."""
+    return search.start(deadline, ordering if move_orderer is None else move_orderer, stop,
+                        telemetry, max_nodes,
+                        table=transposition_table if table is None else table)
+
+def _get_pool(workers):
+    global _pool, _pool_size
+    if _pool_size != workers:
+        if _pool is None:
+            atexit.register(_close_pool)
+        else:
+            _pool.terminate()
+        # Fresh interpreters: forking the threaded server could copy a lock
+        # some other thread holds at that moment
+        _pool = multiprocessing.get_context("spawn").Pool(workers)
+        _pool_size = workers
+    return _pool
+
+def _close_pool():
+    if _pool is not None:
+        _pool.terminate()
+
+def _search_chunk(task):
+    """Pool worker: search_root() over a share of the root moves, with the
+    worker's own transposition table; None if the deadline hit first."""
+    board, prev_move, player, moves, depth, deadline = task
+    _set_limits(deadline)  # worker processes report only the depth, via play()
+    if depth == 1:
+        transposition_table.new_search()
+        ordering.new_search()
+    pos = EvalPosition.from_board(board, prev_move, player)
+    try:
+        return search_root(pos, moves, depth, player)
+    except SearchTimeout:
+        return None
+
+def play(board, prev_move, player, budget=None, seed=None):
+    """budget: search nodes instead of TIME_LIMIT (which remains a safety
+    cap), searched serially; seed: makes the move depend only on the
+    arguments, by searching with empty tables of its own instead of the
+    shared ones."""
     start_time = time.time()
-    transposition_table = {}
-
-    valid_moves = get_valid_moves(board, prev_move, board)
+    max_nodes = float("inf") if budget is None else budget
+    solver_tables = None
+    if seed is not None:
+        # Other games keep using (and aging) the shared tables meanwhile
+        _set_limits(start_time + TIME_LIMIT, telemetry=telemetry.current(), max_nodes=max_nodes,
+                    table=TranspositionTable(TT_MEGABYTES), move_orderer=MoveOrderer())
+        solver_tables = endgame.new_tables()
+    else:
+        _set_limits(start_time + TIME_LIMIT, telemetry=telemetry.current(), max_nodes=max_nodes)
+
+    pos = EvalPosition.from_board(board, prev_move, player)
+    if seed is None and not _take_ponder(pos.key):
+        transposition_table.new_search()
+        ordering.new_search()
+
+    move = opening_book.lookup(pos, rng=random if seed is None else random.Random(seed))
+    if move is not None:
+        stats.update(depth=0, workers=1, seconds=time.time() - start_time, book=True,
+                     endgame=None)
+        return move
+
+    # Few empty cells left: play the proven best move if the solve finishes
+    if endgame.should_solve(pos):
+        nodes = endgame.stats["nodes"]
+        result = endgame.solve(pos, start_time + TIME_LIMIT * ENDGAME_SHARE,
+                               None if budget is None else budget * ENDGAME_SHARE,
+                               solver_tables)
+        t = search.limits.telemetry
+        if t is not None:
+            t.nodes += endgame.stats["nodes"] - nodes
+        if result is not None:
+            outcome, distance, move = result
+            stats.update(depth=pos.count_empty(), workers=1, seconds=time.time() - start_time,
+                         book=False, endgame=(outcome, distance))
+            if t is not None:
+                t.depth = pos.count_empty()
+            return move
+
+    # Only won or drawn boards have empty cells left: any of them is legal
+    valid_moves = pos.get_valid_moves(open_only=True) or pos.get_valid_moves()
+    # In a symmetric position (the opening) moves that mirror each other are
+    # searched once
+    valid_moves = symmetry.unique_moves(pos, valid_moves)
 
     # Move ordering: sort moves that go to center/corner first
     move_scores = []
@@ -34,119 +244,203 @@ def play(board, prev_move, player):
 
     sorted_moves = [m for _, m in sorted(move_scores, reverse=True)]
 
-    best_score = float("-inf")
-    best_move = sorted_moves[0]
-
-    for move in sorted_moves:
-        temp_board = copy.deepcopy(board)
-        make_move(temp_board, move, player)
-
-        score = minimax(temp_board, move, MAX_DEPTH - 1, False, player, float("-inf"), float("inf"))
-
-        if score > best_score:
-            best_score = score
-            best_move = move
-
+    # Worker processes can't share the node count: budgets are searched serially
+    workers = 1 if budget is not None else min(SEARCH_WORKERS, len(sorted_moves), os.cpu_count() or 1)
+
+    def split_root(depth):
+        # Root splitting: every worker gets every n-th move, so the previous
+        # iteration's best moves are spread over all of them
+        tasks = [(board, prev_move, player, sorted_moves[i::workers], depth, search.limits.deadline)
+                 for i in range(workers)]
+        results = _get_pool(workers).map(_search_chunk, tasks)
+        if None in results:
+            return None
+        scores = {}
+        for chunk_scores in results:
+            scores.update(chunk_scores)
+        return scores
+
+    best_move, completed = search.deepen(
+        pos, sorted_moves,
+        split_root if workers > 1 else lambda depth: search_root(pos, sorted_moves, depth, player),
+        MAX_DEPTH)
+    stats.update(depth=completed, workers=workers, seconds=time.time() - start_time,
+                 book=False, endgame=None)
     return best_move
 
-def minimax(board, prev_move, depth, maximizing, player, alpha, beta):
-    global start_time, transposition_table
-
-    if time.time() - start_time > TIME_LIMIT:
-        return evaluate(board, player)
-
-    board_key = hash_board(board)
-    if (board_key, depth, maximizing) in transposition_table:
-        return transposition_table[(board_key, depth, maximizing)]
+def _register_ponder(roots):
+    token = object()
+    with _pondered_lock:
+        for key in roots:
+            _pondered[key] = token
+            _pondered.move_to_end(key)
+        while len(_pondered) > PONDERED_MAX:
+            _pondered.popitem(last=False)
+
+
+def _take_ponder(key):
+    """True if a ponder() searched the position with this key; forgets that
+    ponder's positions, whose game has now moved on."""
+    with _pondered_lock:
+        token = _pondered.pop(key, None)
+        if token is None:
+            return False
+        for other in [k for k, t in _pondered.items() if t is token]:
+            del _pondered[other]
+        return True
+
+
+def ponder(board, prev_move, player, stop):
+    """Think on the opponent's time: `player` is to move (same arguments as
+    play() would get for them).  Runs the root search play() would run after
+    each of their replies, deepening all of them together with the likeliest
+    replies first, until the stop Event is set.  The results stay in the
+    transposition table for the play() call after the real reply.  Returns
+    the last depth completed for every reply."""
+    transposition_table.new_search()
+    ordering.new_search()
+    _set_limits(time.time() + PONDER_LIMIT, stop)
+
+    pos = EvalPosition.from_board(board, prev_move, player)
+    bot = 3 - player
+    lines = {}  # reply -> our moves after it, best first
+    roots = []
+    for reply in pos.get_valid_moves(open_only=True):
+        pos.push(reply)
+        if pos.get_winner() is None:
+            lines[reply] = pos.get_valid_moves(open_only=True) or pos.get_valid_moves()
+            roots.append(pos.key)
+        pos.pop()
+    _register_ponder(roots)
+    best = dict.fromkeys(lines, 0)
+
+    completed = 0
+    try:
+        for depth in range(1, min(MAX_DEPTH, pos.count_empty() - 1) + 1):
+            for reply in sorted(lines, key=best.get):  # their best reply first
+                moves = lines[reply]
+                pos.push(reply)
+                try:
+                    scores = search_root(pos, moves, depth, bot)
+                finally:
+                    pos.pop()
+                moves.sort(key=scores.get, reverse=True)
+                best[reply] = scores[moves[0]]
+            completed = depth
+    except SearchTimeout:
+        pass
+    return completed
+
+def search_root(pos, moves, depth, player):
+    scores = {}
+    best_score = float("-inf")
+    for move in moves:
+        pos.push(move)
+        score = minimax(pos, depth - 1, False, player, best_score, float("inf"), 1)
+        pos.pop()
+        scores[move] = score
+        best_score = max(best_score, score)
+    return scores
+
+def minimax(pos, depth, maximizing, player, alpha, beta, ply):
+    limits = search.tick()
+    t = limits.telemetry
+    if t is not None:
+        t.nodes += 1
+        t.tt_probes += 1
+
+    key = pos.key ^ PLAYER_SALT[player]
+    entry = limits.table.probe(key)
+    tt_move = None
+    if entry is not None:
+        if t is not None:
+            t.tt_hits += 1
+        tt_depth, flag, value, tt_move = entry
+        if tt_depth >= depth:
+            if flag == EXACT:
+                return value
+            if flag == LOWER and value >= beta:
+                return value
+            if flag == UPPER and value <= alpha:
+                return value
 
     if depth == 0:
-        return evaluate(board, player)
+        if t is not None:
+            t.evals += 1
+        return evaluate(pos, player)
 
-    valid_moves = get_valid_moves(board, prev_move, board)
+    valid_moves = pos.get_valid_moves(open_only=True)
     if not valid_moves:
-        return evaluate(board, player)
+        if t is not None:
+            t.evals += 1
+        return evaluate(pos, player)
+    valid_moves = search.order(pos, valid_moves, ply, depth, tt_move)
 
+    alpha_orig, beta_orig = alpha, beta
     best_val = float("-inf") if maximizing else float("inf")
-    opponent = 2 if player == 1 else 1
+    best_move = None
 
-    for move in valid_moves:
-        temp_board = copy.deepcopy(board)
-        make_move(temp_board, move, player if maximizing else opponent)
-        eval = minimax(temp_board, move, depth-1, not maximizing, player, alpha, beta)
+    for i, move in enumerate(valid_moves):
+        pos.push(move)
+        eval = minimax(pos, depth-1, not maximizing, player, alpha, beta, ply + 1)
+        pos.pop()
 
         if maximizing:
-            best_val = max(best_val, eval)
+            if eval > best_val:
+                best_val, best_move = eval, move
             alpha = max(alpha, eval)
         else:
-            best_val = min(best_val, eval)
+            if eval < best_val:
+                best_val, best_move = eval, move
             beta = min(beta, eval)
 
         if beta <= alpha:
+            limits.ordering.cutoff(move, ply, pos.curr_player, depth)
+            if t is not None:
+                t.cutoff(i)
             break
 
-    transposition_table[(board_key, depth, maximizing)] = best_val
+    if best_val <= alpha_orig:
+        flag = UPPER
+    elif best_val >= beta_orig:
+        flag = LOWER
+    else:
+        flag = EXACT
+    limits.table.store(key, depth, flag, best_val, best_move)
     return best_val
 
-def evaluate(board, player):
+def evaluate(pos, player):
+    """Score of an EvalPosition for player; equals evaluate_full()."""
+    return pos.local[player] + pos.glob[player]
+
+def evaluate_full(pos, player):
+    """The evaluation computed from scratch, for any UltimateTTT; the
+    reference the incremental EvalPosition scores are checked against by
+    eval_check.py."""
     opp = 2 if player == 1 else 1
     score = 0
-    position_weights = [[2, -2, 2], [-2, 3, -2], [2, -2, 2]]
-    mainboard = [[0 for _ in range(3)] for _ in range(3)]
-
-    for i in range(3):
-        for j in range(3):
-            mini = [[board[i * 3 + x][j * 3 + y] for y in range(3)] for x in range(3)]
-            winner = check_local_winner(mini)
-            mainboard[i][j] = winner
-
-            if winner == player:
-                score += 50
-            elif winner == opp:
-                score -= 50
-            elif winner == 3:
-                score -= 10
-
-            # Attack & defense evaluation
-            def line_score(line, p):
-                if line.count(p) == 2 and line.count(0) == 1:
-                    return True
-                return False
-
-            for r in range(3):
-                row = mini[r]
-                if line_score(row, player):
-                    score += 15
-                elif line_score(row, opp):
-                    score -= 20
-
-            for c in range(3):
-                col = [mini[r][c] for r in range(3)]
-                if line_score(col, player):
-                    score += 15
-                elif line_score(col, opp):
-                    score -= 20
-
-            diag1 = [mini[d][d] for d in range(3)]
-            diag2 = [mini[d][2 - d] for d in range(3)]
-
-            if line_score(diag1, player):
-                score += 15
-            elif line_score(diag1, opp):
-                score -= 20
-
-            if line_score(diag2, player):
-                score += 15
-            elif line_score(diag2, opp):
-                score -= 20
-
-            # Positional bias
-            for r in range(3):
-                for c in range(3):
-                    cell = mini[r][c]
-                    if cell == player:
-                        score += position_weights[r][c]
-                    elif cell == opp:
-                        score -= position_weights[r][c] // 2
+    mainboard = pos.status
+    xs, os_ = pos.masks[1], pos.masks[2]
+    own_masks = xs if player == 1 else os_
+    opp_masks = os_ if player == 1 else xs
+    player_twos, opp_twos = TWOS[player], TWOS[opp]
+
+    for b in range(9):
+        winner = mainboard[b]
+
+        if winner == player:
+            score += 50
+        elif winner == opp:
+            score -= 50
+        elif winner == 3:
+            score -= 10
+
+        # Attack & defense evaluation: open two-in-a-rows on every line
+        idx = TERNARY[xs[b]] + 2 * TERNARY[os_[b]]
+        score += 15 * POPCOUNT[player_twos[idx]] - 20 * POPCOUNT[opp_twos[idx]]
+
+        # Positional bias
+        score += OWN_BONUS[own_masks[b]] - OPP_PENALTY[opp_masks[b]]
 
     # Global alignment
     def score_line(a, b, c):
@@ -158,63 +452,12 @@ def evaluate(board, player):
             return -300
         return 0
 
-    for r in range(3):
-        score += score_line(mainboard[r][0], mainboard[r][1], mainboard[r][2])
+    for r in range(0, 9, 3):
+        score += score_line(mainboard[r], mainboard[r + 1], mainboard[r + 2])
     for c in range(3):
-        score += score_line(mainboard[0][c], mainboard[1][c], mainboard[2][c])
-    score += score_line(mainboard[0][0], mainboard[1][1], mainboard[2][2])
-    score += score_line(mainboard[0][2], mainboard[1][1], mainboard[2][0])
+        score += score_line(mainboard[c], mainboard[c + 3], mainboard[c + 6])
+    score += score_line(mainboard[0], mainboard[4], mainboard[8])
+    score += score_line(mainboard[2], mainboard[4], mainboard[6])
 
     return score
 
-
-def get_valid_moves(board, prev_move, full_board):
-    def is_block_active(r, c):
-        mini = [[board[r * 3 + x][c * 3 + y] for y in range(3)] for x in range(3)]
-        winner = check_local_winner(mini)
-        return winner == 0  # only playable if not won/drawn
-
-    if prev_move is None:
-        return [(r, c) for r in range(9) for c in range(9) if board[r][c] == 0]
-
-    mr, mc = prev_move[0] % 3, prev_move[1] % 3
-
-    # Check if target mini-board is still active
-    if is_block_active(mr, mc):
-        nr, nc = mr * 3, mc * 3
-        return [(r, c) for r in range(nr, nr+3) for c in range(nc, nc+3) if board[r][c] == 0]
-    else:
-        # If not active, any move in any active mini-board is allowed
-        valid = []
-        for br in range(3):
-            for bc in range(3):
-                if is_block_active(br, bc):
-                    nr, nc = br * 3, bc * 3
-                    for r in range(nr, nr+3):
-                        for c in range(nc, nc+3):
-                            if board[r][c] == 0:
-                                valid.append((r, c))
-        return valid
-
-
-def make_move(board, move, player):
-    r, c = move
-    board[r][c] = player
-
-def check_local_winner(mini):
-    for r in range(3):
-        if mini[r][0] == mini[r][1] == mini[r][2] != 0:
-            return mini[r][0]
-    for c in range(3):
-        if mini[0][c] == mini[1][c] == mini[2][c] != 0:
-            return mini[0][c]
-    if mini[0][0] == mini[1][1] == mini[2][2] != 0:
-        return mini[0][0]
-    if mini[0][2] == mini[1][1] == mini[2][0] != 0:
-        return mini[0][2]
-    if all(mini[i][j] != 0 for i in range(3) for j in range(3)):
-        return 3
-    return 0
-
-def hash_board(board):
-    return str(board)  # Simple hash; fast enough for our purposes
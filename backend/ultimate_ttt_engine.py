@@ -1,80 +1,243 @@
+import random
+from operator import index
+
+from mini_tables import FULL, POPCOUNT, STATUS, TERNARY, grid_index
+
 X, O, DRAW = 1, 2, 3
 
-def check_small(board, minir, minic):
-    b = [[0 for _ in range(3)] for _ in range(3)]  
-    for i in range(3):
-        for j in range(3):
-            b[i][j] = board[minir * 3 + i][minic * 3 + j]
+# Bitboard layout: mini-board b = (r // 3) * 3 + c // 3 holds a 9-bit mask per
+# player, cell bit i = (r % 3) * 3 + c % 3.  The same 9-bit layout is used for
+# the macro board (one bit per mini-board) in the won/drawn/full masks.
 
-    for r in range(3):
-        if b[r][0] == b[r][1] == b[r][2] != 0:
-            return b[r][0]
+# CELLS[b][mask] -> list of (r, c) for every set bit of mask in mini-board b
+CELLS = [[[((b // 3) * 3 + i // 3, (b % 3) * 3 + i % 3)
+           for i in range(9) if mask >> i & 1]
+          for mask in range(512)]
+         for b in range(9)]
 
-    for c in range(3):
-        if b[0][c] == b[1][c] == b[2][c] != 0:
-            return b[0][c]
+# Zobrist keys: one per (player, cell), one for O to move and one per forced
+# mini-board (index 9 = free move).  Seeded so keys are stable across processes.
+_rng = random.Random(0x5EED)
+ZOBRIST_CELLS = [None] + [[_rng.getrandbits(64) for _ in range(81)] for _ in range(2)]
+ZOBRIST_SIDE = _rng.getrandbits(64)
+ZOBRIST_TARGET = [_rng.getrandbits(64) for _ in range(10)]
+del _rng
 
-    if b[0][0] == b[1][1] == b[2][2] != 0:
-        return b[0][0]
 
-    if b[0][2] == b[1][1] == b[2][0] != 0:
-        return b[0][2]
+def small_status(xmask, omask):
+    return STATUS[TERNARY[xmask] + 2 * TERNARY[omask]]
 
-    if all(b[i][j] != 0 for i in range(3) for j in range(3)):
-        return 3
-    return 0
 
+def global_status(xwon, owon):
+    # Won mini-boards never overlap, so the only non-line STATUS is "full"
+    s = STATUS[TERNARY[xwon] + 2 * TERNARY[owon]]
+    return 0 if s == DRAW else s
+
+
+def check_small(board, minir, minic):
+    return STATUS[grid_index(board, minir, minic)]
 
 
 def check_global(mainboard):
-    for r in range(3):
-        if mainboard[r][0] == mainboard[r][1] == mainboard[r][2] != 0 and mainboard[r][0] != DRAW:
-            return mainboard[r][0]
-    for c in range(3):
-        if mainboard[0][c] == mainboard[1][c] == mainboard[2][c] != 0 and mainboard[0][c] != DRAW:
-            return mainboard[0][c]
-    if mainboard[0][0] == mainboard[1][1] == mainboard[2][2] != 0 and mainboard[0][0] != DRAW:
-        return mainboard[0][0]
-    if mainboard[0][2] == mainboard[1][1] == mainboard[2][0] != DRAW and mainboard[0][2] != 0:
-        return mainboard[0][2]
-    return 0
+    xwon = owon = 0
+    for i in range(9):
+        v = mainboard[i // 3][i % 3]
+        if v == X:
+            xwon |= 1 << i
+        elif v == O:
+            owon |= 1 << i
+    return global_status(xwon, owon)
 
 class UltimateTTT:
     def __init__(self):
-        self.board = []
-        for _ in range(9):
-            self.board.append([0]*9)
-
-        self.mainboard = []
-        for _ in range(3):
-            self.mainboard.append([0]*3)
+        # masks[player][b]: cells of mini-board b owned by player (index 0 unused)
+        self.masks = [None, [0] * 9, [0] * 9]
+        self.status = [0] * 9      # per mini-board: 0, X, O or DRAW
+        self.won = [0, 0, 0]       # won[player]: macro mask of mini-boards won
+        self.drawn = 0             # macro mask of drawn mini-boards
+        self.full = 0              # macro mask of mini-boards with no empty cell
 
-        self.last = None
+        self._last = None
+        self.forced = None         # mini-board the next move must go to, if any
         self.curr_player = X
+        self._undo = []            # push() records, newest last
+        self.key = ZOBRIST_TARGET[9]
+
+    @classmethod
+    def from_board(cls, board, last=None, curr_player=X):
+        """Position from a 9x9 list board, e.g. the arguments of a bot's play()."""
+        game = cls()
+        game._reset_masks(board)
+        game._last = tuple(last) if last else None
+        game.curr_player = curr_player
+        game.forced = game._forced_after(game._last)
+        game.key = game.compute_key()
+        return game
+
+    def _reset_masks(self, board):
+        self.masks = [None, [0] * 9, [0] * 9]
+        for r in range(9):
+            row = board[r]
+            for c in range(9):
+                v = row[c]
+                if v == X or v == O:
+                    self.masks[v][(r // 3) * 3 + c // 3] |= 1 << ((r % 3) * 3 + c % 3)
+        for b in range(9):
+            self._update_status(b)
+
+    def compute_key(self):
+        """Zobrist key from scratch; push()/pop() keep self.key in sync."""
+        key = 0
+        for p in (X, O):
+            for b, mask in enumerate(self.masks[p]):
+                for i in range(9):
+                    if mask >> i & 1:
+                        key ^= ZOBRIST_CELLS[p][b * 9 + i]
+        if self.curr_player == O:
+            key ^= ZOBRIST_SIDE
+        t = self.target()
+        return key ^ ZOBRIST_TARGET[9 if t is None else t]
+
+    # The list-of-lists views below are rebuilt on every access, so callers
+    # (app.py, bots) can read or mutate them without touching the bitboards.
+    # Assigning board or last (as older bots like random_bot.py do) rebuilds
+    # the bitboards; it drops the undo history, so don't mix it with push().
+    @property
+    def board(self):
+        grid = [[0] * 9 for _ in range(9)]
+        for p in (X, O):
+            for b, mask in enumerate(self.masks[p]):
+                for r, c in CELLS[b][mask]:
+                    grid[r][c] = p
+        return grid
+
+    @board.setter
+    def board(self, board):
+        self._reset_masks(board)
+        self._undo = []
+        self.forced = self._forced_after(self._last)
+        self.key = self.compute_key()
 
-    def get_valid_moves(self):
-        if not self.last:
-            return [(r, c) for r in range(9) for c in range(9) if self.board[r][c] == 0]
-        mr, mc = self.last[0] % 3, self.last[1] % 3
-        nr, nc = mr*3, mc*3
-        if self.mainboard[mr][mc] != 0 or all(self.board[r][c] != 0 for r in range(nr, nr+3) for c in range(nc, nc+3)):
-            return [(r, c) for r in range(9) for c in range(9) if self.board[r][c] == 0]
-        
-        return [(r, c) for r in range(nr, nr+3) for c in range(nc, nc+3) if self.board[r][c] == 0]
+    @property
+    def last(self):
+        return self._last
+
+    @last.setter
+    def last(self, last):
+        self._last = tuple(last) if last else None
+        self._undo = []
+        self.forced = self._forced_after(self._last)
+        self.key = self.compute_key()
+
+    @property
+    def mainboard(self):
+        s = self.status
+        return [s[0:3], s[3:6], s[6:9]]
+
+    @property
+    def open_boards(self):
+        return FULL & ~(self.won[X] | self.won[O] | self.drawn)
+
+    def target(self):
+        """Mini-board the next move is forced into, or None for a free move."""
+        return self.forced
+
+    def _forced_after(self, last):
+        if not last:
+            return None
+        b = (last[0] % 3) * 3 + last[1] % 3
+        if self.status[b] or self.full >> b & 1:
+            return None
+        return b
+
+    def count_empty(self):
+        xs, os_ = self.masks[X], self.masks[O]
+        return 81 - sum(POPCOUNT[xs[b] | os_[b]] for b in range(9))
+
+    def get_valid_moves(self, open_only=False):
+        """Legal moves; open_only skips won mini-boards on a free move."""
+        xs, os_ = self.masks[X], self.masks[O]
+        b = self.forced
+        if b is not None:
+            return list(CELLS[b][FULL ^ (xs[b] | os_[b])])
+        moves = []
+        boards = self.open_boards if open_only else FULL
+        for b in range(9):
+            if boards >> b & 1:
+                moves += CELLS[b][FULL ^ (xs[b] | os_[b])]
+        return moves
 
     def move(self, r, c):
-        if (r, c) not in self.get_valid_moves(): return False
-        self.board[r][c] = self.curr_player
-        tr, tc = r//3, c//3
-        self.mainboard[tr][tc] = check_small(self.board, tr, tc)
-        self.last = (r, c)
-        self.curr_player = O if self.curr_player == X else X
+        try:
+            r, c = index(r), index(c)
+        except TypeError:
+            return False
+        if not (0 <= r < 9 and 0 <= c < 9):
+            return False
+        b = (r // 3) * 3 + c // 3
+        bit = 1 << ((r % 3) * 3 + c % 3)
+        xs, os_ = self.masks[X], self.masks[O]
+        if (xs[b] | os_[b]) & bit:
+            return False
+        t = self.forced
+        if t is not None and t != b:
+            return False
+
+        self.push((r, c))
         return True
 
+    def push(self, move):
+        """Play a legal move in place without validation; pop() undoes it."""
+        r, c = move
+        b = (r // 3) * 3 + c // 3
+        i = (r % 3) * 3 + c % 3
+        won, player, old = self.won, self.curr_player, self.forced
+        self._undo.append((b, self.status[b], won[X], won[O], self.drawn, self.full,
+                           self._last, old, self.key))
+        self.masks[player][b] |= 1 << i
+        self._update_status(b)
+        self._last = move
+        self.curr_player = O if player == X else X
+        forced = None if self.status[i] or self.full >> i & 1 else i
+        self.forced = forced
+        self.key ^= (ZOBRIST_CELLS[player][b * 9 + i] ^ ZOBRIST_SIDE
+                     ^ ZOBRIST_TARGET[9 if old is None else old]
+                     ^ ZOBRIST_TARGET[9 if forced is None else forced])
+
+    def pop(self):
+        """Undo the most recent push() and return its move."""
+        move = self._last
+        r, c = move
+        b, status, xwon, owon, drawn, full, last, self.forced, self.key = self._undo.pop()
+        self.curr_player = O if self.curr_player == X else X
+        self.masks[self.curr_player][b] &= ~(1 << ((r % 3) * 3 + c % 3))
+        self.status[b] = status
+        self.won[X], self.won[O] = xwon, owon
+        self.drawn, self.full = drawn, full
+        self._last = last
+        return move
+
+    def _update_status(self, b):
+        xm, om = self.masks[X][b], self.masks[O][b]
+        s = small_status(xm, om)
+        self.status[b] = s
+        macro = 1 << b
+        self.won[X] &= ~macro
+        self.won[O] &= ~macro
+        self.drawn &= ~macro
+        if s == DRAW:
+            self.drawn |= macro
+        elif s:
+            self.won[s] |= macro
+        if xm | om == FULL:
+            self.full |= macro
+        else:
+            self.full &= ~macro
+
     def get_winner(self):
-        g = check_global(self.mainboard)
+        g = global_status(self.won[X], self.won[O])
         if g != 0: return g
-        if all(self.board[r][c] != 0 for r in range(9) for c in range(9)): return DRAW
+        if self.full == FULL: return DRAW
         return None
 
     def print_board(self):
@@ -89,15 +252,16 @@ class UltimateTTT:
         active = None
         if self.last:
             mr, mc = self.last[0] % 3, self.last[1] % 3
-            if self.mainboard[mr][mc] == 0:
+            if self.status[mr * 3 + mc] == 0:
                 active = (mr, mc)
 
+        board = self.board
         print("\nCurrent board state:")
         for r in range(9):
             row_str = ''
             for c in range(9):
                 sr, sc = r//3, c//3
-                val = maps(self.board[r][c])
+                val = maps(board[r][c])
                 if active and (sr, sc) == active:
                     val = f"[{val}]"
                 else:
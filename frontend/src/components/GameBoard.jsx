@@ -32,64 +32,56 @@ const GameBoard = ({ config, onQuit }) => {
 
   const [loading, setLoading] = useState(false); // ⬅️ add at top of GameBoard
 
-  const runBotBattle = async () => {
+  const runBotBattle = () => {
     console.log("runBotBattle called");
-    try {
-      setLoading(true); // Show loading while waiting for backend
-      const res = await fetch(`${API_BASE}/bot-vs-bot-run`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ game_id }),
-      });
-
-      const text = await res.text();
-      console.log("Raw response text:", text);
-
-      const data = JSON.parse(text);
-      console.log("Parsed JSON:", data);
-
-      if (data.success) {
-        const { move_history = [], winner } = data;
-
-        // Save move history
-        setMoveHistory(move_history);
+    setLoading(true); // Show loading until the first move arrives
 
-        let tempBoard = Array(9).fill().map(() => Array(9).fill(0));
-        let tempMain = Array(3).fill().map(() => Array(3).fill(0));
+    // The server streams each move as soon as the bot plays it
+    let tempBoard = Array(9).fill().map(() => Array(9).fill(0));
+    let tempMain = Array(3).fill().map(() => Array(3).fill(0));
+    let history = [];
+    const source = new EventSource(`${API_BASE}/bot-vs-bot-stream?game_id=${game_id}`);
 
-        // Hide loading NOW, before animating
-        setLoading(false);
+    source.addEventListener("move", (event) => {
+      const entry = JSON.parse(event.data);
+      const [r, c] = entry.move;
+      const { index, status } = entry.miniboard;
 
-        const playMoves = async () => {
-          for (let i = 0; i < move_history.length; i++) {
-            const { player, move } = move_history[i];
-            const [r, c] = move;
+      tempBoard = tempBoard.map(row => [...row]);
+      tempBoard[r][c] = entry.player;
+      tempMain = tempMain.map(row => [...row]);
+      tempMain[Math.floor(index / 3)][index % 3] = status;
+      history = [...history, entry];
 
-            tempBoard = tempBoard.map(row => [...row]);
-            tempBoard[r][c] = player;
-            
-            setLastMoveCell([r, c]); // highlight last bot move
-
-            setBoard(tempBoard);
-            setMainboard(tempMain);
-            setMoveNumber(i + 1);
-
-            await new Promise(resolve => setTimeout(resolve, 200));
-          }
-          setWinner(winner);
-        };
-
-        playMoves();
-      } else {
-        console.log("Bot battle failed:", data.error);
-        alert(data.error || "Bot battle failed");
-        setLoading(false);
-      }
-    } catch (err) {
-      console.error("Error running bot battle:", err);
-      alert("Error running bot battle");
       setLoading(false);
-    }
+      setLastMoveCell([r, c]); // highlight last bot move
+      setBoard(tempBoard);
+      setMainboard(tempMain);
+      setMoveHistory(history);
+      setMoveNumber(history.length);
+    });
+
+    source.addEventListener("end", (event) => {
+      const result = JSON.parse(event.data);
+      source.close();
+      setLoading(false);
+      setWinner(result.winner);
+    });
+
+    source.addEventListener("error", (event) => {
+      if (event.data) {
+        // Error reported by the server: the match is over
+        const { error } = JSON.parse(event.data);
+        console.log("Bot battle failed:", error);
+        alert(error || "Bot battle failed");
+        source.close();
+      } else if (source.readyState === EventSource.CLOSED) {
+        console.error("Bot battle stream closed");
+        alert("Error running bot battle");
+      }
+      // Otherwise the browser reconnects and resumes after the last move
+      if (source.readyState === EventSource.CLOSED) setLoading(false);
+    });
   };
 
   useEffect(() => {
@@ -11,11 +11,12 @@ const Menu = ({ onSelect }) => {
   const [player1Name, setPlayer1Name] = useState("Player 1");
   const [player2Name, setPlayer2Name] = useState("Player 2");
   const [botFile, setBotFile] = useState(null); // NEW
+  const [ponder, setPonder] = useState(false); // bot thinks while you do
   const [isSubmitting, setIsSubmitting] = useState(false); // optional for UX
   const [showDetailedRules, setShowDetailedRules] = useState(false);
 
 
-  const difficulties = ["Very Easy", "Easy", "Medium", "Hard", "Ultimate"];
+  const difficulties = ["Very Easy", "Easy", "Medium", "Hard", "Ultimate", "MCTS"];
   const modes = ["Player vs Bot", "Player vs Player", "Bot vs Bot"];
 
   useEffect(() => {
@@ -45,6 +46,7 @@ const Menu = ({ onSelect }) => {
           playerRole,
           player1Name,
           player2Name,
+          ponder,
         });
       }
 
@@ -166,6 +168,16 @@ const Menu = ({ onSelect }) => {
                     ))}
                   </div>
                 </div>
+
+                <label className="mt-6 flex items-center justify-center gap-2 text-brown_dark text-sm font-medium">
+                  <input
+                    type="checkbox"
+                    checked={ponder}
+                    onChange={(e) => setPonder(e.target.checked)}
+                    className="accent-gold_accent"
+                  />
+                  Let the bot think on my time (Ultimate, MCTS)
+                </label>
               </div>
             )}
 